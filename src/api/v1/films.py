@@ -1,11 +1,19 @@
 from http import HTTPStatus
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 
-from api.v1.utils import PaginatedParams, SortEnum, get_permissions
+from api.v1.utils import (
+    CursorPaginatedParams,
+    PaginatedParams,
+    encode_cursor,
+    get_permissions,
+    json_response,
+)
+from core.config import settings
 from core.logger import logger as _logger
-from models.film import DetailFilmResponse, FilmResponse
+from models.batch import BatchRequest
+from models.film import DetailFilmResponse, FilmResponse, SortEnum
 from services.film import FilmService, get_film_service
 from services.response_messages import FilmMessages as Msg
 
@@ -17,25 +25,35 @@ router = APIRouter()
     path='/',
     response_model=list[FilmResponse],
     summary='Главная страница кинопроизведений',
-    description='Полный перечень кинопроизведений',
+    description=(
+        'Полный перечень кинопроизведений. Курсор следующей страницы возвращается в заголовке X-Next-Cursor '
+        'и передаётся в page[cursor]; глубокие страницы доступны только по курсору'
+    ),
     response_description='Список из названий и рейтингов кинопроизведений',
 )
 async def films(
     sort: SortEnum,
     service: FilmService = Depends(get_film_service),
-    paginate: PaginatedParams = Depends(),
+    paginate: CursorPaginatedParams = Depends(),
     _filter: UUID | None = Query(default=None, alias='filter[genre]'),
-) -> list[FilmResponse] | None:
-    films = await service.get_by_search(
+    permissions: list = Depends(get_permissions),
+) -> Response:
+    if paginate.search_after is None and paginate.num * paginate.size > settings.elastic.MAX_RESULT_WINDOW:
+        logger.debug('[-] %s. page: %s', Msg.too_deep_page.value, paginate.num)
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=Msg.too_deep_page.value)
+    films, next_page = await service.get_page(
         sort=sort,
         page_size=paginate.size,
         page_num=paginate.num,
+        search_after=paginate.search_after,
         _filter=_filter,
+        permissions=permissions,
     )
     if not films:
         logger.debug('[-] %s.', Msg.not_found.value)
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=Msg.not_found.value)
-    return films
+    headers = {'X-Next-Cursor': encode_cursor(next_page)} if next_page else None
+    return json_response(films, headers=headers)
 
 
 @router.get(
@@ -49,16 +67,18 @@ async def search_film(
     query: str,
     service: FilmService = Depends(get_film_service),
     paginate: PaginatedParams = Depends(),
-) -> list[FilmResponse] | None:
+    permissions: list = Depends(get_permissions),
+) -> Response:
     films = await service.get_by_search(
         query=query,
         page_num=paginate.num,
         page_size=paginate.size,
+        permissions=permissions,
     )
     if not films:
         logger.debug('[-] %s. query: %s', Msg.not_found.value, query)
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=Msg.not_found.value)
-    return films
+    return json_response(films)
 
 
 @router.get(
@@ -72,9 +92,24 @@ async def film_details(
     film_id: str,
     service: FilmService = Depends(get_film_service),
     permissions: list = Depends(get_permissions),
-) -> DetailFilmResponse | None:
+) -> Response:
     film = await service.get_by_id(film_id=film_id, permissions=permissions)
     if not film:
         logger.debug('[-] %s. id: %s', Msg.not_found.value, film_id)
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=Msg.not_found.value)
-    return film
+    return json_response(film)
+
+
+@router.post(
+    path='/batch',
+    response_model=list[DetailFilmResponse],
+    summary='Поиск кинопроизведений по списку ID',
+    description=f'Поиск до {settings.elastic.MAX_BATCH_IDS} кинопроизведений по ID одним запросом',
+    response_description='Полная информация о найденных кинопроизведениях в порядке запроса',
+)
+async def films_batch(
+    batch: BatchRequest,
+    service: FilmService = Depends(get_film_service),
+    permissions: list = Depends(get_permissions),
+) -> Response:
+    return json_response(await service.get_by_ids(batch.ids, permissions=permissions))
@@ -1,8 +1,11 @@
 from http import HTTPStatus
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 
+from api.v1.utils import json_response
+from core.config import settings
 from core.logger import logger as _logger
+from models.batch import BatchRequest
 from models.genre import DetailGenreResponse
 from services.genre import GenreService, get_genre_service
 from services.response_messages import GenreMessages as Msg
@@ -21,12 +24,12 @@ router = APIRouter()
 async def get_genre(
     uuid: str,
     service: GenreService = Depends(get_genre_service),
-) -> DetailGenreResponse | None:
+) -> Response:
     genre = await service.get(uuid)
     if not genre:
         logger.debug('[-] %s. uuid:%s', Msg.not_found.value, uuid)
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=Msg.not_found.value)
-    return genre
+    return json_response(genre)
 
 
 @router.get(
@@ -38,5 +41,19 @@ async def get_genre(
 )
 async def get_genres(
     service: GenreService = Depends(get_genre_service),
-) -> list[DetailGenreResponse] | None:
-    return await service.get_multi()
+) -> Response:
+    return json_response(await service.get_multi())
+
+
+@router.post(
+    path='/batch',
+    response_model=list[DetailGenreResponse],
+    summary='Поиск жанров по списку ID',
+    description=f'Поиск до {settings.elastic.MAX_BATCH_IDS} жанров по ID одним запросом',
+    response_description='Полная информация о найденных жанрах в порядке запроса',
+)
+async def genres_batch(
+    batch: BatchRequest,
+    service: GenreService = Depends(get_genre_service),
+) -> Response:
+    return json_response(await service.get_by_ids(batch.ids))
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Response
+
+from api.v1.utils import get_permissions, json_response
+from core.config import settings
+from models.page import PageRequest, PageResponse
+from services.page import PageService, get_page_service
+
+router = APIRouter()
+
+
+@router.post(
+    path='/home',
+    response_model=PageResponse,
+    summary='Составная страница',
+    description=(
+        f'Выполнение до {settings.elastic.MAX_PAGE_QUERIES} именованных запросов списков фильмов и жанров '
+        'за одно обращение к Elasticsearch'
+    ),
+    response_description='Результаты запросов по их именам',
+)
+async def home_page(
+    page: PageRequest,
+    service: PageService = Depends(get_page_service),
+    permissions: list = Depends(get_permissions),
+) -> Response:
+    return json_response(await service.get(page.queries, permissions=permissions))
@@ -1,9 +1,12 @@
 from http import HTTPStatus
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 
-from api.v1.utils import PaginatedParams
+from api.v1.utils import CursorPaginatedParams, PaginatedParams, encode_cursor, json_response, stream_json_array
+from core.config import settings
 from core.logger import logger as _logger
+from models.batch import BatchRequest
 from models.film import FilmResponse
 from models.person import DetailPersonResponse
 from services.person import PersonService, get_person_service
@@ -24,7 +27,7 @@ async def search_person(
     query: str,
     service: PersonService = Depends(get_person_service),
     paginate: PaginatedParams = Depends(),
-) -> list[DetailPersonResponse] | None:
+) -> Response:
     person = await service.get_person_by_search(
         query=query,
         page_num=paginate.num,
@@ -33,7 +36,7 @@ async def search_person(
     if not person:
         logger.debug('[-] %s. query: %s', Msg.not_found.value, query)
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=Msg.not_found.value)
-    return person
+    return json_response(person)
 
 
 @router.get(
@@ -46,27 +49,63 @@ async def search_person(
 async def person_details(
     person_id: str,
     service: PersonService = Depends(get_person_service),
-) -> DetailPersonResponse | None:
+) -> Response:
     person = await service.get_by_id(person_id=person_id)
     if not person:
         logger.debug('[-] %s. id: %s', Msg.not_found.value, person_id)
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=Msg.not_found.value)
-    return person
+    return json_response(person)
 
 
 @router.get(
     path='/{person_id}/film',
     response_model=list[FilmResponse],
     summary='Поиск всех кинопроизведений персоны по его ID',
-    description='Поиск персоны по его ID и выдача всех его кинопроизведений',
+    description=(
+        'Поиск персоны по его ID и выдача его кинопроизведений постранично, с курсором следующей страницы '
+        'в заголовке X-Next-Cursor. При stream=true выдаются все кинопроизведения потоком'
+    ),
     response_description='Список названий и рейтингов кинопроизведений',
 )
 async def person_films(
     person_id: str,
     service: PersonService = Depends(get_person_service),
-) -> list[FilmResponse] | None:
-    person_films = await service.get_film_person_by_search(_person=person_id)
+    paginate: CursorPaginatedParams = Depends(),
+    stream: bool = Query(default=False),
+) -> Response:
+    if stream:
+        return await stream_person_films(person_id, service)
+    person_films, next_page = await service.get_film_person_page(
+        _person=person_id,
+        page_num=paginate.num,
+        page_size=paginate.size,
+        search_after=paginate.search_after,
+    )
     if not person_films:
         logger.debug('[-] %s. id: %s', Msg.not_found.value, person_id)
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=Msg.not_found.value)
-    return person_films
+    headers = {'X-Next-Cursor': encode_cursor(next_page)} if next_page else None
+    return json_response(person_films, headers=headers)
+
+
+@router.post(
+    path='/batch',
+    response_model=list[DetailPersonResponse],
+    summary='Поиск персон по списку ID',
+    description=f'Поиск до {settings.elastic.MAX_BATCH_IDS} персон по ID одним запросом',
+    response_description='Имена, роли и фильмографии найденных персон в порядке запроса',
+)
+async def persons_batch(
+    batch: BatchRequest,
+    service: PersonService = Depends(get_person_service),
+) -> Response:
+    return json_response(await service.get_by_ids(batch.ids))
+
+
+async def stream_person_films(person_id: str, service: PersonService) -> StreamingResponse:
+    batches = service.iter_film_person(_person=person_id, batch_size=settings.elastic.STREAM_BATCH_SIZE)
+    first_batch = await anext(batches, None)
+    if not first_batch:
+        logger.debug('[-] %s. id: %s', Msg.not_found.value, person_id)
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=Msg.not_found.value)
+    return StreamingResponse(stream_json_array(first_batch, batches), media_type='application/json')
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends
+from http import HTTPStatus
+
+from fastapi import APIRouter, Depends, HTTPException, Request
 
 from core import auth
 from core.logger import logger as _logger
-from db.cache import CacheProtocol, get_cache_instance
+from db.cache import CacheInvalidator, CacheWarmer, get_cache_invalidator, get_cache_warmer
+from db.tags import id_tag, index_tag
+from models.cache import InvalidateRequest, InvalidateResponse, WarmResponse
+from services.response_messages import CacheMessages as Msg
 
 logger = _logger(__name__)
 router = APIRouter()
@@ -12,6 +17,44 @@ auth_handler = auth.AuthHandler()
 @router.post('/flush-cache')
 async def flush_cache(
     _user: dict = Depends(auth_handler.auth_wrapper),
-    cache: CacheProtocol = Depends(get_cache_instance),
+    cache: CacheInvalidator = Depends(get_cache_invalidator),
 ):
-    await cache.flushall()
+    await cache.flush()
+
+
+@router.post(
+    path='/invalidate',
+    response_model=InvalidateResponse,
+    summary='Инвалидация кеша',
+    description='Удаление из кеша ответов, содержащих указанные документы или построенных по указанным индексам',
+    response_description='Количество удалённых записей кеша',
+)
+async def invalidate_cache(
+    tags: InvalidateRequest,
+    _user: dict = Depends(auth_handler.auth_wrapper),
+    cache: CacheInvalidator = Depends(get_cache_invalidator),
+) -> InvalidateResponse:
+    invalidated = await cache.invalidate(
+        [*(id_tag(_id) for _id in tags.ids), *(index_tag(index) for index in tags.indices)],
+    )
+    logger.debug('[+] Invalidated %s cache entries.', invalidated)
+    return InvalidateResponse(invalidated=invalidated)
+
+
+@router.post(
+    path='/warm-cache',
+    response_model=WarmResponse,
+    summary='Прогрев кеша',
+    description='Повтор самых частых запросов через приложение с записью ответов в кеш',
+    response_description='Количество запросов, ответы на которые получены; 409, если прогрев уже выполняется',
+)
+async def warm_cache(
+    request: Request,
+    _user: dict = Depends(auth_handler.auth_wrapper),
+    warmer: CacheWarmer = Depends(get_cache_warmer),
+) -> WarmResponse:
+    warmed = await warmer.warm_once(request.app)
+    if warmed is None:
+        raise HTTPException(status_code=HTTPStatus.CONFLICT, detail=Msg.warming_in_progress.value)
+    logger.debug('[+] Warmed %s cache entries.', warmed)
+    return WarmResponse(warmed=warmed)
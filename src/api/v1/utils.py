@@ -1,17 +1,14 @@
+import base64
 import dataclasses
-from enum import Enum
-from datetime import datetime
+import inspect
+from http import HTTPStatus
+from typing import AsyncIterator, Callable
 
-from fastapi import Query, Request, HTTPException
-from fastapi.security import HTTPBearer
-import jwt
+import orjson
+from fastapi import HTTPException, Query, Request, Response, params
+from fastapi.responses import ORJSONResponse
 
-from core.config import settings
-
-
-class SortEnum(str, Enum):
-    desc_rating = '-imdb_rating'
-    asc_rating = 'imdb_rating'
+from core.auth import decode_permissions
 
 
 @dataclasses.dataclass
@@ -28,9 +25,46 @@ class PaginatedParams:
         self.size = size
 
 
-def get_verified_jwt(jwtoken: str) -> dict:
-    decoded_token = jwt.decode(jwtoken, settings.jwt.SECRET_KEY, algorithms=[settings.jwt.ALGORITHM])
-    return decoded_token if decoded_token['exp'] >= datetime.now() else None
+@dataclasses.dataclass
+class CursorPaginatedParams(PaginatedParams):
+    search_after: list | None = None
+
+    def __init__(
+        self,
+        num: int = Query(default=1, alias='page[number]', ge=1),
+        size: int = Query(default=50, alias='page[size]', ge=1),
+        cursor: str | None = Query(default=None, alias='page[cursor]'),
+    ):
+        super().__init__(num=num, size=size)
+        self.search_after = decode_cursor(cursor) if cursor else None
+
+
+def encode_cursor(search_after: list) -> str:
+    """
+    Непрозрачный курсор следующей страницы.
+    :param search_after: значения сортировки последнего документа страницы
+    :return: курсор
+    """
+    return base64.urlsafe_b64encode(orjson.dumps(search_after)).decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    """
+    Значения сортировки для search_after из курсора: рейтинг и id последнего документа страницы.
+    :param cursor: курсор из page[cursor]
+    :return: значения сортировки
+    """
+    try:
+        search_after = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        search_after = None
+    is_valid = isinstance(search_after, list) and len(search_after) == 2
+    if is_valid:
+        rating, _id = search_after
+        is_valid = isinstance(rating, (int, float)) and not isinstance(rating, bool) and isinstance(_id, str)
+    if not is_valid:
+        raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail='Invalid page[cursor]')
+    return search_after
 
 
 async def get_permissions(request: Request) -> list:
@@ -39,10 +73,46 @@ async def get_permissions(request: Request) -> list:
     :param request: запрос, передаётся автоматически при использовании Depends в ручке
     :return: список разрешений
     """
-    try:
-        bearer = HTTPBearer()
-        credentials = await bearer(request)
-        claims = get_verified_jwt(credentials.credentials)
-        return claims.get('permissions') if claims.get('permissions') else []
-    except HTTPException as e:
-        return []
+    permissions = getattr(request.state, 'permissions', None)
+    if permissions is None:
+        permissions = request.state.permissions = decode_permissions(request.headers.get('Authorization'))
+    return permissions
+
+
+def get_query_defaults(dependency: Callable) -> dict[str, str]:
+    """
+    Значения по умолчанию query параметров зависимости.
+    :param dependency: класс или функция, используемая в Depends
+    :return: словарь {alias параметра: значение по умолчанию}
+    """
+    defaults = {}
+    for name, parameter in inspect.signature(dependency).parameters.items():
+        field = parameter.default
+        if isinstance(field, params.Query) and field.default is not Ellipsis:
+            defaults[field.alias or name] = str(field.default)
+    return defaults
+
+
+async def stream_json_array(first_batch: list[dict], batches: AsyncIterator[list[dict]]) -> AsyncIterator[bytes]:
+    """
+    Потоковая сериализация пачек объектов в один JSON массив.
+    :param first_batch: уже полученная первая пачка
+    :param batches: асинхронный итератор остальных пачек
+    :return: асинхронный итератор частей тела ответа
+    """
+    yield b'[' + b','.join(orjson.dumps(item) for item in first_batch)
+    async for batch in batches:
+        if batch:
+            yield b',' + b','.join(orjson.dumps(item) for item in batch)
+    yield b']'
+
+
+def json_response(content: bytes | list | dict, headers: dict[str, str] | None = None) -> Response:
+    """
+    Ответ из данных сервиса: готовый JSON в виде bytes отдаётся как есть, остальное сериализуется orjson.
+    :param content: данные сервиса
+    :param headers: заголовки ответа
+    """
+    if isinstance(content, bytes):
+        return Response(content, media_type='application/json', headers=headers)
+    return ORJSONResponse(content, headers=headers)
@@ -1,8 +1,10 @@
+from typing import Iterable
+
 import jwt
 from fastapi import HTTPException, Security
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
-from core.config import settings
+from core.config import PermissionSettings, settings
 
 
 class AuthHandler:
@@ -19,3 +21,45 @@ class AuthHandler:
 
     async def auth_wrapper(self, auth: HTTPAuthorizationCredentials = Security(security)):
         return await self.decode_token(auth.credentials)
+
+
+def normalize_permissions(values: Iterable) -> list[PermissionSettings]:
+    """
+    Приведение разрешений из claims токена (значения или названия PermissionSettings) к PermissionSettings.
+    :param values: разрешения из токена
+    :return: список разрешений без неизвестных значений
+    """
+    permissions = []
+    for value in values:
+        if isinstance(value, int) and not isinstance(value, bool) and value in PermissionSettings._value2member_map_:
+            permissions.append(PermissionSettings(value))
+        elif isinstance(value, str) and value in PermissionSettings.__members__:
+            permissions.append(PermissionSettings[value])
+    return permissions
+
+
+def decode_permissions(authorization: str | None) -> list[PermissionSettings]:
+    """
+    Разрешения пользователя из заголовка Authorization.
+    :param authorization: значение заголовка
+    :return: список разрешений; пустой, если токена нет или он невалиден
+    """
+    scheme, _, token = (authorization or '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return []
+    try:
+        claims = jwt.decode(token, settings.jwt.SECRET_KEY, algorithms=[settings.jwt.ALGORITHM])
+    except jwt.InvalidTokenError:
+        return []
+    return normalize_permissions(claims.get('permissions') or [])
+
+
+def get_permission_tier(permissions: Iterable[PermissionSettings]) -> PermissionSettings:
+    """
+    Уровень доступа, от которого зависит содержимое ответов: подписчик или обычный пользователь.
+    :param permissions: разрешения пользователя
+    :return: PermissionSettings.Subscriber или PermissionSettings.User
+    """
+    if settings.permission.Subscriber in permissions:
+        return settings.permission.Subscriber
+    return settings.permission.User
@@ -0,0 +1,74 @@
+import asyncio
+from typing import Callable, Coroutine
+
+from core.logger import logger as _logger
+
+logger = _logger(__name__)
+
+
+class BackgroundTasks:
+    """
+    Фоновые задачи компонента сервиса: периодическая задача и разовые задачи, запущенные по событиям,
+    например по сообщениям об инвалидации. Ожидаемые ошибки обрабатывает сама работа, неожиданные
+    записываются в лог при завершении задачи и не останавливают периодическую задачу.
+    """
+
+    def __init__(self):
+        self._periodic: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._pending: set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> bool:
+        """Есть ли незавершённые разовые задачи."""
+        return bool(self._pending)
+
+    def start(self, func: Callable[[], Coroutine], interval: float, delay: bool = False):
+        """
+        Запуск периодической задачи, если она ещё не запущена.
+        :param func: работа, выполняемая раз в interval
+        :param interval: период в секундах
+        :param delay: выполнить работу первый раз через interval, а не сразу
+        """
+        if self._periodic is None:
+            self._periodic = self._create_task(self._repeat(func, interval, delay))
+
+    def schedule(self, coro: Coroutine):
+        """
+        Запуск разовой задачи.
+        :param coro: работа
+        """
+        task = self._create_task(coro)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def stop(self):
+        """Отмена всех задач."""
+        tasks = list(self._tasks)
+        # Отмена может быть потеряна внутри проверки соединения клиента Redis (async_timeout(0)),
+        # поэтому отменяем, пока задачи не завершатся
+        while tasks := [task for task in tasks if not task.done()]:
+            for task in tasks:
+                task.cancel()
+            await asyncio.wait(tasks, timeout=0.1)
+        self._periodic = None
+
+    def _create_task(self, coro: Coroutine) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(self._log_failure)
+        return task
+
+    async def _repeat(self, func: Callable[[], Coroutine], interval: float, delay: bool):
+        if delay:
+            await asyncio.sleep(interval)
+        while True:
+            # Каждое выполнение - отдельная задача, чтобы неожиданная ошибка не прерывала повторы
+            await asyncio.wait({self._create_task(func())})
+            await asyncio.sleep(interval)
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task):
+        if not task.cancelled() and (error := task.exception()) is not None:
+            logger.error('Background task %s failed', task.get_coro(), exc_info=error)
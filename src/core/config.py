@@ -30,6 +30,14 @@ class RedisSettings(BaseConfig):
 class ElasticSettings(BaseConfig):
     HOST: str = '127.0.0.1'
     PORT: int = 9200
+    MAX_RESULT_WINDOW: int = 10_000
+    STREAM_BATCH_SIZE: int = 500
+    PASSTHROUGH: bool = True
+    GET_BATCH_ENABLED: bool = True
+    GET_BATCH_WINDOW_IN_MICROSECONDS: int = 0
+    GET_BATCH_MAX_SIZE: int = 100
+    MAX_BATCH_IDS: int = 100
+    MAX_PAGE_QUERIES: int = 10
 
     class Config:
         env_prefix = 'ES_'
@@ -39,6 +47,104 @@ class ElasticSettings(BaseConfig):
         return [{'host': self.HOST, 'port': self.PORT}]
 
 
+class CacheSettings(BaseConfig):
+    LOCAL_ENABLED: bool = False
+    LOCAL_MAX_ENTRIES: int = 1000
+    LOCAL_MAX_BYTES: int = 64 * 1024 * 1024
+    LOCAL_EXPIRE_IN_SECONDS: int = 30
+    INVALIDATION_CHANNEL: str = 'cache:invalidation'
+    LOCK_EXPIRE_IN_MILLISECONDS: int = 5000
+    LOCK_POLL_INTERVAL_IN_MILLISECONDS: int = 50
+    # Мягкий и жёсткий TTL записей по префиксу пути: (soft, hard)
+    EXPIRE_IN_SECONDS: dict[str, tuple[int, int]] = {
+        '/api/v1/films': (60 * 5, 60 * 60),
+        '/api/v1/genres': (60 * 5, 60 * 60),
+        '/api/v1/persons': (60 * 5, 60 * 60),
+    }
+    DEFAULT_EXPIRE_IN_SECONDS: int = 60 * 5
+    # Время жизни отдельных документов, закешированных пакетными ручками
+    DOCUMENT_EXPIRE_IN_SECONDS: int = 60 * 60
+    # Ответы большего размера не кешируются и не накапливаются в памяти
+    MAX_ENTRY_SIZE_IN_BYTES: int = 2 * 1024 * 1024
+    # Префиксы путей, ответы 404 которых кешируются, и время их жизни
+    NEGATIVE_PREFIXES: list[str] = ['/api/v1/films', '/api/v1/genres', '/api/v1/persons']
+    NEGATIVE_EXPIRE_IN_SECONDS: int = 30
+    # Префиксы путей, ответы которых зависят от уровня доступа пользователя
+    PERMISSION_AWARE_PREFIXES: list[str] = ['/api/v1/films']
+    # Query параметры, значения которых не зависят от регистра и пробелов по краям, по путям
+    NORMALIZED_QUERY_PARAMS: dict[str, list[str]] = {
+        '/api/v1/films/search': ['query'],
+        '/api/v1/persons/search': ['query'],
+    }
+
+    class Config:
+        env_prefix = 'CACHE_'
+
+    def get_expire(self, path: str) -> tuple[int, int]:
+        for prefix, expire in self.EXPIRE_IN_SECONDS.items():
+            if path.startswith(prefix):
+                return expire
+        return self.DEFAULT_EXPIRE_IN_SECONDS, self.DEFAULT_EXPIRE_IN_SECONDS
+
+    @property
+    def max_expire(self) -> int:
+        return max(
+            [
+                self.DEFAULT_EXPIRE_IN_SECONDS,
+                self.DOCUMENT_EXPIRE_IN_SECONDS,
+                *(hard for _, hard in self.EXPIRE_IN_SECONDS.values()),
+            ],
+        )
+
+
+class BloomSettings(BaseConfig):
+    ENABLED: bool = False
+    INDICES: list[str] = ['movies', 'genres', 'persons']
+    ERROR_RATE: float = 0.001
+    CAPACITY_FACTOR: float = 1.5
+    REFRESH_INTERVAL_IN_SECONDS: int = 60 * 10
+
+    class Config:
+        env_prefix = 'BLOOM_'
+
+
+class GenreCatalogueSettings(BaseConfig):
+    ENABLED: bool = True
+    REFRESH_INTERVAL_IN_SECONDS: int = 60 * 5
+
+    class Config:
+        env_prefix = 'GENRE_CATALOGUE_'
+
+
+class FilmPagesSettings(BaseConfig):
+    ENABLED: bool = True
+    # Количество первых страниц каждого списка и их размер, совпадающий с page[size] по умолчанию
+    PAGES: int = 5
+    PAGE_SIZE: int = 50
+    REFRESH_INTERVAL_IN_SECONDS: int = 60
+
+    class Config:
+        env_prefix = 'FILM_PAGES_'
+
+
+class CacheWarmingSettings(BaseConfig):
+    ENABLED: bool = True
+    # Прогрев при старте сервиса и после полной очистки кеша
+    ON_STARTUP: bool = True
+    ON_FLUSH: bool = True
+    # Количество самых частых запросов для прогрева и размер хранимой статистики
+    TOP_N: int = 500
+    MAX_TRACKED: int = 10000
+    # Период записи счётчиков обращений из памяти воркера в Redis
+    FLUSH_INTERVAL_IN_SECONDS: int = 10
+    CONCURRENCY: int = 4
+    RATE_PER_SECOND: float = 50
+    LOCK_EXPIRE_IN_SECONDS: int = 60
+
+    class Config:
+        env_prefix = 'CACHE_WARMING_'
+
+
 class PermissionSettings(Enum):
     User = 0
     Subscriber = 1
@@ -62,6 +168,11 @@ class ProjectSettings(BaseConfig):
     FILM_CACHE_EXPIRE_IN_SECONDS = 60 * 5
     redis: RedisSettings = RedisSettings()
     elastic: ElasticSettings = ElasticSettings()
+    cache: CacheSettings = CacheSettings()
+    bloom: BloomSettings = BloomSettings()
+    genre_catalogue: GenreCatalogueSettings = GenreCatalogueSettings()
+    film_pages: FilmPagesSettings = FilmPagesSettings()
+    cache_warming: CacheWarmingSettings = CacheWarmingSettings()
     permission = PermissionSettings
     jwt = JWTSettings()
 
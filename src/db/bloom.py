@@ -0,0 +1,143 @@
+import asyncio
+import collections
+import hashlib
+import math
+from typing import AsyncIterator, Iterator, Protocol
+
+from elasticsearch import ElasticsearchException
+
+from core.background import BackgroundTasks
+from core.config import settings
+from core.logger import logger as _logger
+from db.tags import ID_TAG_PREFIX, INDEX_TAG_PREFIX
+
+logger = _logger(__name__)
+
+
+class IdSource(Protocol):
+    async def count(self, *args, **kwargs) -> int:
+        ...
+
+    def scan_ids(self, *args, **kwargs) -> AsyncIterator[str]:
+        ...
+
+
+class BloomFilter:
+    """Фильтр Блума: отрицательный ответ гарантирует, что элемент не добавлялся."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        """
+        :param capacity: ожидаемое количество элементов
+        :param error_rate: допустимая доля ложноположительных ответов
+        """
+        capacity = max(capacity, 1)
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray(math.ceil(self.size / 8))
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class IdFilters:
+    """
+    Фильтры Блума с id всех документов по индексам. Строятся при старте сервиса обходом индексов,
+    периодически перестраиваются и пополняются по сообщениям об инвалидации кеша.
+    """
+
+    def __init__(self, indices: list[str], error_rate: float, capacity_factor: float, refresh_interval: int):
+        """
+        :param indices: индексы, для которых строятся фильтры
+        :param error_rate: допустимая доля ложноположительных ответов
+        :param capacity_factor: запас ёмкости фильтра под документы, добавленные после построения
+        :param refresh_interval: период полного перестроения фильтров в секундах
+        """
+        self.indices = indices
+        self.error_rate = error_rate
+        self.capacity_factor = capacity_factor
+        self.refresh_interval = refresh_interval
+        self.filters: dict[str, BloomFilter] = {}
+        self._source: IdSource | None = None
+        self._tasks = BackgroundTasks()
+        self._added_during_build: dict[str, set[str]] = {}
+        self._build_locks: dict[str, asyncio.Lock] = collections.defaultdict(asyncio.Lock)
+
+    def might_contain(self, index: str, _id: str) -> bool:
+        """
+        Проверка, может ли документ существовать. Пока фильтр индекса не построен, ответ всегда True.
+        :param index: название индекса
+        :param _id: id документа
+        """
+        bloom_filter = self.filters.get(index)
+        return bloom_filter is None or _id in bloom_filter
+
+    async def build(self, index: str):
+        """
+        Построение фильтра индекса и атомарная замена предыдущего. Построения одного индекса выполняются
+        по очереди, чтобы более раннее построение не заменило фильтр более позднего.
+        :param index: название индекса
+        """
+        async with self._build_locks[index]:
+            added_during_build = self._added_during_build[index] = set()
+            try:
+                count = await self._source.count(index)
+                bloom_filter = BloomFilter(int(count * self.capacity_factor), self.error_rate)
+                async for _id in self._source.scan_ids(index):
+                    bloom_filter.add(_id)
+                for _id in added_during_build:
+                    bloom_filter.add(_id)
+            finally:
+                del self._added_during_build[index]
+            self.filters[index] = bloom_filter
+        logger.info('Bloom filter for index %s is built: %s ids, %s bytes', index, count, len(bloom_filter.bits))
+
+    def start(self, source: IdSource):
+        self._source = source
+        self._tasks.start(self._rebuild_all, self.refresh_interval)
+
+    async def stop(self):
+        await self._tasks.stop()
+
+    def on_invalidation(self, message: dict):
+        """
+        Обработчик сообщений InvalidationListener: id документов добавляются во все фильтры,
+        при инвалидации индекса его фильтр перестраивается.
+        """
+        for tag in message.get('tags', []):
+            if tag.startswith(ID_TAG_PREFIX):
+                _id = tag.removeprefix(ID_TAG_PREFIX)
+                for bloom_filter in self.filters.values():
+                    bloom_filter.add(_id)
+                for added_during_build in self._added_during_build.values():
+                    added_during_build.add(_id)
+            elif tag.startswith(INDEX_TAG_PREFIX) and (index := tag.removeprefix(INDEX_TAG_PREFIX)) in self.indices:
+                self._tasks.schedule(self._rebuild(index))
+
+    async def _rebuild(self, index: str):
+        try:
+            await self.build(index)
+        except ElasticsearchException:
+            logger.exception('Failed to build bloom filter for index %s', index)
+
+    async def _rebuild_all(self):
+        for index in self.indices:
+            await self._rebuild(index)
+
+
+id_filters: IdFilters = IdFilters(
+    indices=settings.bloom.INDICES,
+    error_rate=settings.bloom.ERROR_RATE,
+    capacity_factor=settings.bloom.CAPACITY_FACTOR,
+    refresh_interval=settings.bloom.REFRESH_INTERVAL_IN_SECONDS,
+)
@@ -1,12 +1,32 @@
-from typing import Awaitable, Protocol
+import asyncio
+import collections
+import dataclasses
+import hashlib
+import struct
+import time
+import uuid
+from http import HTTPStatus
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator, Protocol
+from urllib.parse import urlsplit
 
+import aioredis
+import jwt
 import orjson
-from fastapi.responses import ORJSONResponse
-from starlette.requests import Request
-from starlette.responses import StreamingResponse
+from elasticsearch import ElasticsearchException
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from core.background import BackgroundTasks
 from core.config import settings
+from core.logger import logger as _logger
+from db import invalidation
+from db.cache_key import KEY_PREFIX, CacheKeyBuilder, document_key, entry_key, tag_key, tag_keys, warming_key
+from db.invalidation import InvalidationListener
+from db.local_cache import LocalCache
 from db.redis import redis
+from db.tags import id_tag, index_tag, request_tags
+
+logger = _logger(__name__)
 
 
 class CacheProtocol(Protocol):
@@ -16,57 +36,768 @@ class CacheProtocol(Protocol):
     def set(self, *args, **kwargs) -> Awaitable:
         ...
 
-    def flushall(self, *args, **kwargs) -> Awaitable:
+    def mget(self, *args, **kwargs) -> Awaitable:
+        ...
+
+    def getrange(self, *args, **kwargs) -> Awaitable:
+        ...
+
+    def exists(self, *args, **kwargs) -> Awaitable:
+        ...
+
+    def hmget(self, *args, **kwargs) -> Awaitable:
+        ...
+
+    def pipeline(self, *args, **kwargs) -> Any:
+        ...
+
+    def sunion(self, *args, **kwargs) -> Awaitable:
+        ...
+
+    def unlink(self, *args, **kwargs) -> Awaitable:
+        ...
+
+    def scan_iter(self, *args, **kwargs) -> AsyncIterator:
+        ...
+
+    def eval(self, *args, **kwargs) -> Awaitable:
+        ...
+
+    def zrevrange(self, *args, **kwargs) -> Awaitable:
+        ...
+
+    def delete(self, *args, **kwargs) -> Awaitable:
         ...
 
 
+@dataclasses.dataclass(frozen=True)
+class CacheEntry:
+    """
+    Запись кеша в бинарном формате: заголовок фиксированной длины (версия формата, статус, момент устаревания,
+    длина блока заголовков, хеш тела для ETag), блок HTTP заголовков ответа и тело ответа без изменений.
+    Заголовок фиксированной длины читается отдельно для ответа на условные запросы без загрузки тела.
+    """
+
+    VERSION = 3
+    PREFIX = struct.Struct('!BHdI16s')
+
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+    stale_at: float = 0
+    digest: bytes = b''
+
+    @property
+    def is_stale(self) -> bool:
+        return self.stale_at < time.time()
+
+    @property
+    def etag(self) -> bytes | None:
+        """Сильный ETag ответа; выдаётся только для ответов 200."""
+        if self.status != HTTPStatus.OK or not self.digest:
+            return None
+        return self.format_etag(self.digest)
+
+    @staticmethod
+    def hash(body: bytes) -> bytes:
+        return hashlib.blake2b(body, digest_size=16).digest()
+
+    @staticmethod
+    def format_etag(digest: bytes) -> bytes:
+        return b'"%s"' % digest.hex().encode()
+
+    def dumps(self) -> bytes:
+        raw_headers = b'\r\n'.join(b'%s: %s' % (name, value) for name, value in self.headers)
+        prefix = self.PREFIX.pack(self.VERSION, self.status, self.stale_at, len(raw_headers), self.digest)
+        return b''.join((prefix, raw_headers, self.body))
+
+    @classmethod
+    def loads(cls, data: bytes) -> 'CacheEntry | None':
+        if (entry := cls.loads_prefix(data)) is None:
+            return None
+        headers_start = cls.PREFIX.size
+        body_start = headers_start + cls.PREFIX.unpack_from(data)[3]
+        raw_headers = data[headers_start:body_start]
+        headers = [tuple(line.split(b': ', 1)) for line in raw_headers.split(b'\r\n')] if raw_headers else []
+        return dataclasses.replace(entry, headers=headers, body=data[body_start:])
+
+    @classmethod
+    def loads_prefix(cls, data: bytes) -> 'CacheEntry | None':
+        """
+        Запись без заголовков и тела по заголовку фиксированной длины.
+        :param data: начало записи не короче PREFIX.size
+        :return: запись или None, если формат записи не совпадает
+        """
+        if len(data) < cls.PREFIX.size:
+            return None
+        version, status, stale_at, _, digest = cls.PREFIX.unpack_from(data)
+        if version != cls.VERSION:
+            return None
+        return cls(status=status, headers=[], body=b'', stale_at=stale_at, digest=digest)
+
+
+def add_to_tags(pipe, key: str, tags: Iterable[str]):
+    """
+    Добавление ключа в множества его тегов за текущий период. Множество живёт два периода:
+    записи, добавленные в конце периода, живут не дольше settings.cache.max_expire после его окончания.
+    :param pipe: pipeline клиента Redis
+    :param key: ключ со временем жизни не больше settings.cache.max_expire
+    :param tags: теги ключа
+    """
+    for tag in tags:
+        pipe.sadd(tag_key(tag), key)
+        pipe.expire(tag_key(tag), 2 * settings.cache.max_expire)
+
+
 class CacheMiddleWare:
+    """
+    ASGI middleware кеширующая JSON ответы в Redis.
+
+    Работает напрямую с сообщениями http.response.start / http.response.body,
+    без BaseHTTPMiddleware и повторного разбора тела ответа.
+    Если передан local_cache, он проверяется перед обращением к Redis.
+    Одновременные промахи по одному ключу объединяются: внутри воркера через общий Future,
+    между воркерами через короткую блокировку в Redis.
+    Запись живёт в Redis до жёсткого TTL; после мягкого TTL она отдаётся как есть,
+    а обновление выполняется одной фоновой задачей.
+    Если передан warmer, обращения считаются по каноническому виду запроса для последующего прогрева.
+    Ответы 200 из кеша отдаются с ETag; на If-None-Match с совпадающим ETag отвечает 304 по заголовку
+    фиксированной длины записи, без чтения тела из Redis.
+    """
+
+    RELEASE_LOCK_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('del', KEYS[1])
+    end
+    return 0
+    """
+
     def __init__(
         self,
+        app: ASGIApp,
         client: CacheProtocol,
+        local_cache: LocalCache | None = None,
+        key_builder: CacheKeyBuilder | None = None,
+        warmer: 'CacheWarmer | None' = None,
+        background_tasks: BackgroundTasks | None = None,
     ):
+        self.app = app
         self.client = client
+        self.local_cache = local_cache
+        self.key_builder = key_builder or CacheKeyBuilder()
+        self.warmer = warmer
+        self.in_flight: dict[str, asyncio.Future] = {}
+        self.background_tasks = background_tasks or BackgroundTasks()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http' or scope['method'] != 'GET':
+            await self.app(scope, receive, send)
+            return
+
+        canonical = self.key_builder.canonical(scope)
+        key = entry_key(canonical)
+        if self.warmer is not None:
+            self.warmer.record(canonical, scope)
+        if_none_match = Headers(scope=scope).get('if-none-match')
+        if if_none_match and (entry := await self.get_entry_prefix(key)) and self.etag_matches(if_none_match, entry):
+            await self.send_not_modified(send, entry)
+        elif entry := await self.get_entry(key):
+            await self.send_cached_response(send, entry)
+        if entry:
+            if entry.is_stale and key not in self.in_flight:
+                self.background_tasks.schedule(self.revalidate(key, dict(scope)))
+            return
+
+        if (in_flight := self.in_flight.get(key)) is not None:
+            if entry := await asyncio.shield(in_flight):
+                await self.send_cached_response(send, entry)
+            else:
+                await self.app(scope, receive, send)
+            return
+
+        in_flight = self.in_flight[key] = asyncio.get_running_loop().create_future()
+        entry = None
+        try:
+            entry = await self.fetch_coalesced(key, scope, receive, send)
+        finally:
+            if self.in_flight.get(key) is in_flight:
+                del self.in_flight[key]
+            in_flight.set_result(entry)
+
+    async def fetch_coalesced(self, key: str, scope: Scope, receive: Receive, send: Send) -> CacheEntry | None:
+        """
+        Вычисление ответа при промахе под блокировкой в Redis, чтобы при одновременных промахах на разных
+        воркерах в Elasticsearch ушёл только один запрос. Остальные ждут появления записи в кеше.
+        :return: записанная в кеш запись или None
+        """
+        if token := await self.acquire_lock(key):
+            try:
+                return await self.fetch(key, scope, receive, send)
+            finally:
+                await self.release_lock(key, token)
+        if entry := await self.wait_for_entry(key):
+            await self.send_cached_response(send, entry)
+            return entry
+        return await self.fetch(key, scope, receive, send)
 
-    async def __call__(self, request: Request, call_next):
-        key = str(request.url.include_query_params())
-        cached_response = await self.client.get(key)
-        if not cached_response:
-            response = await call_next(request)
-            if response.status_code == 200 and response.headers.get('content-type') == 'application/json':
-                response, json_response = await self.serialize_response(response)
-                await self.client.set(key, json_response, ex=settings.FILM_CACHE_EXPIRE_IN_SECONDS)
-            return response
-        return await self.deserialize_response(cached_response)
-
-    async def serialize_response(self, response: StreamingResponse) -> tuple[ORJSONResponse, bytes]:
-        serialized_response = {}
-        content = b''
-        async for chunk in response.body_iterator:
-            content += chunk
-
-        content = orjson.loads(content)
-        serialized_response['content'] = content
-        serialized_response['headers'] = dict(response.headers.items())
-        serialized_response['media_type'] = response.media_type
-
-        return ORJSONResponse(
-            status_code=response.status_code,
-            content=content,
-            headers=response.headers,
-            media_type=response.media_type,
-            background=response.background,
-        ), orjson.dumps(serialized_response)
-
-    async def deserialize_response(self, data: bytes) -> ORJSONResponse:
-
-        deserialized_data: dict = orjson.loads(data)
-
-        return ORJSONResponse(
-            content=deserialized_data['content'],
-            headers=deserialized_data['headers'],
-            media_type=deserialized_data['media_type'],
+    async def revalidate(self, key: str, scope: Scope):
+        """
+        Фоновое обновление устаревшей записи. Выполняется только одним воркером, остальные продолжают
+        отдавать устаревшую запись.
+        :param key: ключ кеша
+        :param scope: копия scope исходного запроса
+        """
+        if key in self.in_flight or not (token := await self.acquire_lock(key)):
+            return
+        if key in self.in_flight:
+            # Пока бралась блокировка, по этому ключу начался промах: ответ вычислит он
+            await self.release_lock(key, token)
+            return
+        in_flight = self.in_flight[key] = asyncio.get_running_loop().create_future()
+        entry = None
+        try:
+            entry = await self.fetch(key, scope, self.receive_empty_request(), self.discard_response)
+        except (aioredis.RedisError, ElasticsearchException):
+            logger.exception('Failed to revalidate cache entry: %s', key)
+        finally:
+            if self.in_flight.get(key) is in_flight:
+                del self.in_flight[key]
+            in_flight.set_result(entry)
+            await self.release_lock(key, token)
+
+    async def acquire_lock(self, key: str) -> str | None:
+        token = uuid.uuid4().hex
+        if await self.client.set(f'{key}:lock', token, nx=True, px=settings.cache.LOCK_EXPIRE_IN_MILLISECONDS):
+            return token
+        return None
+
+    async def release_lock(self, key: str, token: str):
+        await self.client.eval(self.RELEASE_LOCK_SCRIPT, 1, f'{key}:lock', token)
+
+    async def wait_for_entry(self, key: str) -> CacheEntry | None:
+        """
+        Ожидание записи, которую вычисляет другой воркер, не дольше времени жизни блокировки.
+        Ожидание прекращается, как только блокировка снята: запись сохраняется до снятия блокировки,
+        поэтому её отсутствие после этого означает, что ответ не кешируется (ошибка, перенаправление, размер).
+        :param key: ключ кеша
+        :return: запись кеша или None
+        """
+        interval = settings.cache.LOCK_POLL_INTERVAL_IN_MILLISECONDS / 1000
+        for _ in range(settings.cache.LOCK_EXPIRE_IN_MILLISECONDS // settings.cache.LOCK_POLL_INTERVAL_IN_MILLISECONDS):
+            await asyncio.sleep(interval)
+            if entry := await self.get_entry(key):
+                return entry
+            if not await self.client.exists(f'{key}:lock'):
+                return await self.get_entry(key)
+        return None
+
+    async def fetch(self, key: str, scope: Scope, receive: Receive, send: Send) -> CacheEntry | None:
+        """
+        Передача запроса приложению с записью ответа в кеш. Запись помечается тегами: id документов из тела
+        ответа, а также индексы и id, к которым обращался репозиторий при обработке запроса.
+        Ответы больше MAX_ENTRY_SIZE_IN_BYTES передаются клиенту без накопления в памяти и не кешируются.
+        Начало ответа отправляется вместе с первым фрагментом тела: если тело передаётся одним фрагментом,
+        к кешируемому ответу добавляется ETag.
+        :return: записанная в кеш запись или None, если ответ не кешируется
+        """
+        response_start: Message = {}
+        response_started = False
+        digest = b''
+        chunks: list[bytes] | None = []
+        size = 0
+        tags: set[str] = set()
+
+        async def send_wrapper(message: Message):
+            nonlocal response_start, response_started, digest, chunks, size
+            if message['type'] == 'http.response.start':
+                response_start = message
+                return
+            if message['type'] == 'http.response.body' and not response_started:
+                response_started = True
+                start, digest = self.start_with_etag(scope['path'], response_start, message)
+                await send(start)
+            if message['type'] == 'http.response.body' and chunks is not None:
+                chunk = message.get('body', b'')
+                size += len(chunk)
+                if size > settings.cache.MAX_ENTRY_SIZE_IN_BYTES:
+                    chunks = None
+                else:
+                    chunks.append(chunk)
+            await send(message)
+
+        tags_token = request_tags.set(tags)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_tags.reset(tags_token)
+
+        if chunks is None or (expire := self.get_expire(scope['path'], response_start)) is None:
+            return None
+        soft_expire, hard_expire = expire
+        body = b''.join(chunks)
+        entry = CacheEntry(
+            status=response_start['status'],
+            headers=response_start['headers'],
+            body=body,
+            stale_at=time.time() + soft_expire,
+            digest=digest or CacheEntry.hash(body),
         )
+        await self.store(key, entry, tags, hard_expire)
+        if self.local_cache is not None:
+            self.local_cache.set(key, entry, len(entry.body))
+        return entry
+
+    async def store(self, key: str, entry: CacheEntry, tags: set[str], expire: int):
+        """
+        Запись в Redis вместе с добавлением ключа в множества его тегов.
+        :param key: ключ кеша
+        :param entry: запись кеша
+        :param tags: теги записи
+        :param expire: время жизни записи в секундах
+        """
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(key, entry.dumps(), ex=expire)
+            add_to_tags(pipe, key, tags)
+            await pipe.execute()
+
+    async def get_entry(self, key: str) -> CacheEntry | None:
+        """
+        Поиск записи сначала в кеше процесса, затем в Redis.
+        :param key: ключ кеша
+        :return: запись кеша или None
+        """
+        if self.local_cache is not None and (entry := self.local_cache.get(key)):
+            return entry
+        data = await self.client.get(key)
+        if not data or (entry := CacheEntry.loads(data)) is None:
+            return None
+        if self.local_cache is not None:
+            self.local_cache.set(key, entry, len(entry.body))
+        return entry
+
+    async def get_entry_prefix(self, key: str) -> CacheEntry | None:
+        """
+        Запись для ответа на условный запрос: из кеша процесса или только заголовок фиксированной длины из Redis.
+        :param key: ключ кеша
+        :return: запись кеша, возможно без заголовков и тела, или None
+        """
+        if self.local_cache is not None and (entry := self.local_cache.get(key)):
+            return entry
+        data = await self.client.getrange(key, 0, CacheEntry.PREFIX.size - 1)
+        return CacheEntry.loads_prefix(data) if data else None
+
+    @staticmethod
+    def etag_matches(if_none_match: str, entry: CacheEntry) -> bool:
+        """
+        Слабое сравнение ETag записи со значениями If-None-Match, как требует RFC 9110 для этого заголовка.
+        :param if_none_match: значение заголовка If-None-Match
+        :param entry: запись кеша
+        :return: совпадает ли ETag записи с одним из значений
+        """
+        if (etag := entry.etag) is None:
+            return False
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return '*' in tags or etag.decode() in tags
+
+    @classmethod
+    def start_with_etag(cls, path: str, response_start: Message, message: Message) -> tuple[Message, bytes]:
+        """
+        Начало ответа с ETag, если тело передаётся одним фрагментом и ответ кешируется.
+        :param path: путь запроса
+        :param response_start: сообщение http.response.start
+        :param message: первое сообщение http.response.body
+        :return: сообщение http.response.start и хеш тела или b'', если тело передаётся несколькими фрагментами
+        """
+        if message.get('more_body', False):
+            return response_start, b''
+        digest = CacheEntry.hash(message.get('body', b''))
+        if response_start['status'] != HTTPStatus.OK or cls.get_expire(path, response_start) is None:
+            return response_start, digest
+        headers = [*response_start['headers'], (b'etag', CacheEntry.format_etag(digest))]
+        return {**response_start, 'headers': headers}, digest
+
+    @staticmethod
+    def get_expire(path: str, response_start: Message) -> tuple[int, int] | None:
+        """
+        Мягкий и жёсткий TTL ответа. Ответы 200 кешируются по настройкам пути, ответы 404 из NEGATIVE_PREFIXES
+        кешируются на NEGATIVE_EXPIRE_IN_SECONDS, остальные ответы не кешируются.
+        :param path: путь запроса
+        :param response_start: сообщение http.response.start
+        :return: (soft, hard) или None
+        """
+        if not response_start or Headers(raw=response_start['headers']).get('content-type') != 'application/json':
+            return None
+        status = response_start['status']
+        if status == HTTPStatus.OK:
+            return settings.cache.get_expire(path)
+        if status == HTTPStatus.NOT_FOUND and path.startswith(tuple(settings.cache.NEGATIVE_PREFIXES)):
+            return settings.cache.NEGATIVE_EXPIRE_IN_SECONDS, settings.cache.NEGATIVE_EXPIRE_IN_SECONDS
+        return None
+
+    @staticmethod
+    def receive_empty_request() -> Receive:
+        """ASGI receive для запросов без тела, выполняемых самим сервисом."""
+        request_sent = False
+
+        async def receive() -> Message:
+            nonlocal request_sent
+            if request_sent:
+                await asyncio.Event().wait()
+            request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        return receive
+
+    @staticmethod
+    async def discard_response(message: Message):
+        ...
+
+    @staticmethod
+    async def send_cached_response(send: Send, entry: CacheEntry):
+        """
+        Отправка клиенту ответа из кеша без разбора тела.
+        :param send: ASGI send
+        :param entry: запись из кеша
+        """
+        headers = entry.headers if (etag := entry.etag) is None else [*entry.headers, (b'etag', etag)]
+        await send({'type': 'http.response.start', 'status': entry.status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': entry.body})
+
+    @staticmethod
+    async def send_not_modified(send: Send, entry: CacheEntry):
+        """
+        Отправка ответа 304 без тела.
+        :param send: ASGI send
+        :param entry: запись из кеша с совпавшим ETag
+        """
+        headers = [(b'etag', entry.etag)]
+        await send({'type': 'http.response.start', 'status': HTTPStatus.NOT_MODIFIED, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+# Фоновые обновления устаревших записей CacheMiddleWare, отменяемые при остановке сервиса
+revalidation_tasks: BackgroundTasks = BackgroundTasks()
+
+
+class CacheInvalidator:
+    """Удаление записей кеша по тегам или целиком в пространстве ключей кеша, без FLUSHALL."""
+
+    BATCH_SIZE = 500
+
+    def __init__(self, client: CacheProtocol, listener: InvalidationListener):
+        """
+        :param client: клиент Redis
+        :param listener: канал рассылки сообщений об инвалидации по воркерам
+        """
+        self.client = client
+        self.listener = listener
+
+    async def invalidate(self, tags: Iterable[str]) -> int:
+        """
+        Удаление всех записей, помеченных хотя бы одним из тегов.
+        :param tags: теги, например id_tag(film_id) или index_tag('movies')
+        :return: количество удалённых записей
+        """
+        tags = list(tags)
+        keys_of_tags = [key for tag in tags for key in tag_keys(tag)]
+        if not keys_of_tags:
+            return 0
+        keys = list(await self.client.sunion(keys_of_tags))
+        for batch in self._batches(keys + keys_of_tags):
+            await self.client.unlink(*batch)
+        await self.listener.publish({'action': 'invalidate', 'tags': tags, 'keys': [key.decode() for key in keys]})
+        return len(keys)
+
+    async def flush(self) -> int:
+        """
+        Удаление всех ключей кеша через SCAN и UNLINK, не блокируя Redis.
+        :return: количество удалённых ключей
+        """
+        keys = [key async for key in self.client.scan_iter(match=f'{KEY_PREFIX}*', count=self.BATCH_SIZE)]
+        for batch in self._batches(keys):
+            await self.client.unlink(*batch)
+        await self.listener.publish({'action': 'flush'})
+        return len(keys)
+
+    @classmethod
+    def _batches(cls, keys: list) -> Iterator[list]:
+        for start in range(0, len(keys), cls.BATCH_SIZE):
+            stop = start + cls.BATCH_SIZE
+            yield keys[start:stop]
+
+
+async def get_cache_invalidator() -> CacheInvalidator:
+    return CacheInvalidator(redis, invalidation.listener)
+
+
+class CacheWarmer:
+    """
+    Прогрев кеша самыми частыми запросами. CacheMiddleWare считает обращения по каноническому виду запроса
+    в памяти воркера, счётчики периодически добавляются в sorted set в Redis. При прогреве самые частые запросы
+    повторяются через ASGI приложение в том же процессе: промахи вычисляются и записываются в кеш.
+    """
+
+    EXTENSION = 'cache.warming'
+    REDIRECT_STATUSES = (HTTPStatus.TEMPORARY_REDIRECT, HTTPStatus.PERMANENT_REDIRECT)
+    TOKEN_EXPIRE_IN_SECONDS = 60
+
+    def __init__(
+        self,
+        client: CacheProtocol,
+        top_n: int,
+        max_tracked: int,
+        flush_interval: int,
+        concurrency: int,
+        rate: float,
+        lock_expire: int,
+    ):
+        """
+        :param client: клиент Redis
+        :param top_n: количество самых частых запросов для прогрева
+        :param max_tracked: количество запросов, статистика которых хранится в Redis
+        :param flush_interval: период записи счётчиков в Redis в секундах
+        :param concurrency: количество одновременно выполняемых запросов при прогреве
+        :param rate: количество запросов в секунду при прогреве
+        :param lock_expire: время жизни блокировки прогрева в секундах
+        """
+        self.client = client
+        self.top_n = top_n
+        self.max_tracked = max_tracked
+        self.flush_interval = flush_interval
+        self.concurrency = concurrency
+        self.rate = rate
+        self.lock_expire = lock_expire
+        self.hits: collections.Counter[str] = collections.Counter()
+        self._app: ASGIApp | None = None
+        self._tasks = BackgroundTasks()
+
+    def record(self, canonical: str, scope: Scope):
+        """
+        Учёт обращения. Запросы самого прогрева не учитываются.
+        :param canonical: канонический вид запроса
+        :param scope: ASGI scope запроса
+        """
+        if self.EXTENSION not in (scope.get('extensions') or {}):
+            self.hits[canonical] += 1
+
+    async def flush_hits(self):
+        """Добавление накопленных счётчиков в Redis с удалением самых редких запросов сверх max_tracked."""
+        if not self.hits:
+            return
+        hits, self.hits = self.hits, collections.Counter()
+        async with self.client.pipeline(transaction=False) as pipe:
+            for canonical, count in hits.items():
+                pipe.zincrby(warming_key('hits'), count, canonical)
+            pipe.zremrangebyrank(warming_key('hits'), 0, -self.max_tracked - 1)
+            await pipe.execute()
+
+    async def top(self) -> list[str]:
+        return [member.decode() for member in await self.client.zrevrange(warming_key('hits'), 0, self.top_n - 1)]
+
+    async def warm(self, app: ASGIApp) -> int:
+        """
+        Повтор top_n самых частых запросов не более чем по concurrency одновременно и rate в секунду.
+        :param app: ASGI приложение вместе с CacheMiddleWare
+        :return: количество запросов, выполненных со статусом 200
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        canonicals = await self.top()
+        tasks = []
+        try:
+            for canonical in canonicals:
+                await semaphore.acquire()
+                task = asyncio.create_task(self.replay(app, canonical))
+                task.add_done_callback(lambda _: semaphore.release())
+                tasks.append(task)
+                await asyncio.sleep(1 / self.rate)
+            # Ошибка обработчика одного запроса не прерывает прогрев остальных
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            for task in tasks:
+                task.cancel()
+        for canonical, result in zip(canonicals, results):
+            if isinstance(result, BaseException):
+                logger.error('Failed to warm cache with request: %s', canonical, exc_info=result)
+        warmed = sum(result is True for result in results)
+        logger.info('Cache is warmed: %s of %s requests', warmed, len(results))
+        return warmed
+
+    async def replay(self, app: ASGIApp, canonical: str) -> bool:
+        """
+        Выполнение запроса по его каноническому виду. Перенаправление на путь с завершающим слэшем,
+        который убирается из канонического вида, выполняется повторным запросом.
+        :param app: ASGI приложение
+        :param canonical: строка вида '<уровень доступа>:<путь>?<query>'
+        :return: получен ли ответ со статусом 200
+        """
+        tier, _, request = canonical.partition(':')
+        path, _, query_string = request.partition('?')
+        headers = []
+        if tier and tier != settings.permission.User.name:
+            headers.append((b'authorization', f'Bearer {self._token(tier)}'.encode()))
+        try:
+            status, location = await self._request(app, path, query_string, headers)
+            if status in self.REDIRECT_STATUSES and location:
+                status, _ = await self._request(app, urlsplit(location).path, query_string, headers)
+        except (aioredis.RedisError, ElasticsearchException):
+            logger.exception('Failed to warm cache with request: %s', canonical)
+            return False
+        return status == HTTPStatus.OK
+
+    async def _request(
+        self,
+        app: ASGIApp,
+        path: str,
+        query_string: str,
+        headers: list[tuple[bytes, bytes]],
+    ) -> tuple[int | None, str | None]:
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'server': None,
+            'client': None,
+            'root_path': '',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query_string.encode(),
+            'headers': headers,
+            'extensions': {self.EXTENSION: {}},
+        }
+        response_start: Message = {}
+
+        async def send(message: Message):
+            nonlocal response_start
+            if message['type'] == 'http.response.start':
+                response_start = message
+
+        await app(scope, CacheMiddleWare.receive_empty_request(), send)
+        if not response_start:
+            return None, None
+        return response_start['status'], Headers(raw=response_start['headers']).get('location')
+
+    @classmethod
+    def _token(cls, tier: str) -> str:
+        claims = {'permissions': [tier], 'exp': int(time.time()) + cls.TOKEN_EXPIRE_IN_SECONDS}
+        return jwt.encode(claims, settings.jwt.SECRET_KEY, algorithm=settings.jwt.ALGORITHM)
+
+    def start(self, app: ASGIApp, warm: bool = False):
+        """
+        Запуск периодической записи счётчиков.
+        :param app: ASGI приложение для прогрева по сообщениям об очистке кеша
+        :param warm: выполнить прогрев сразу
+        """
+        self._app = app
+        self._tasks.start(self._flush_hits_safely, self.flush_interval, delay=True)
+        if warm:
+            self._tasks.schedule(self._warm_in_background())
+
+    async def stop(self):
+        await self._tasks.stop()
+        await self._flush_hits_safely()
+
+    def on_invalidation(self, message: dict):
+        """Обработчик сообщений InvalidationListener: после полной очистки кеша выполняется прогрев."""
+        if message.get('action') == 'flush' and self._app is not None:
+            self._tasks.schedule(self._warm_in_background())
+
+    async def warm_once(self, app: ASGIApp) -> int | None:
+        """
+        Прогрев одним воркером: остальные воркеры и повторные запуски пропускают его, пока прогрев держит блокировку.
+        :param app: ASGI приложение вместе с CacheMiddleWare
+        :return: количество запросов, выполненных со статусом 200, или None, если прогрев уже выполняется
+        """
+        if not await self.client.set(warming_key('lock'), 1, nx=True, ex=self.lock_expire):
+            return None
+        try:
+            return await self.warm(app)
+        finally:
+            await self.client.delete(warming_key('lock'))
+
+    async def _warm_in_background(self):
+        try:
+            await self.warm_once(self._app)
+        except aioredis.RedisError:
+            logger.exception('Failed to warm cache')
+
+    async def _flush_hits_safely(self):
+        try:
+            await self.flush_hits()
+        except aioredis.RedisError:
+            logger.exception('Failed to store cache warming hits')
+
+
+cache_warmer: CacheWarmer = CacheWarmer(
+    client=redis,
+    top_n=settings.cache_warming.TOP_N,
+    max_tracked=settings.cache_warming.MAX_TRACKED,
+    flush_interval=settings.cache_warming.FLUSH_INTERVAL_IN_SECONDS,
+    concurrency=settings.cache_warming.CONCURRENCY,
+    rate=settings.cache_warming.RATE_PER_SECOND,
+    lock_expire=settings.cache_warming.LOCK_EXPIRE_IN_SECONDS,
+)
+
+
+async def get_cache_warmer() -> CacheWarmer:
+    return cache_warmer
+
+
+class DocumentCache:
+    """Кеш отдельных документов для пакетных ручек: недостающие документы запрашиваются и дописываются в кеш."""
+
+    def __init__(self, client: CacheProtocol, expire: int):
+        """
+        :param client: клиент Redis
+        :param expire: время жизни документа в секундах
+        """
+        self.client = client
+        self.expire = expire
+
+    async def get_many(
+        self,
+        index: str,
+        ids: list[str],
+        fetch: Callable[[list[str]], Awaitable[dict[str, dict]]],
+        tags: Callable[[dict], Iterable[str]] | None = None,
+    ) -> list[dict]:
+        """
+        Получение документов из кеша и недостающих через fetch.
+        :param index: название индекса, в котором хранятся документы
+        :param ids: id документов
+        :param fetch: получение документов, которых нет в кеше, в виде {id: документ}
+        :param tags: дополнительные теги документа, например id вложенных документов
+        :return: найденные документы в порядке ids без повторов
+        """
+        ids = list(dict.fromkeys(ids))
+        cached = await self.client.mget([document_key(index, _id) for _id in ids])
+        docs = {_id: orjson.loads(value) for _id, value in zip(ids, cached) if value is not None}
+        if missing := [_id for _id in ids if _id not in docs]:
+            fetched = await fetch(missing)
+            await self.store(index, fetched, tags)
+            docs.update(fetched)
+        return [docs[_id] for _id in ids if _id in docs]
+
+    async def store(self, index: str, docs: dict[str, dict], tags: Callable[[dict], Iterable[str]] | None = None):
+        """
+        Запись документов с тегами их id и индекса, чтобы CacheInvalidator удалял их вместе с ответами.
+        :param index: название индекса
+        :param docs: документы в виде {id: документ}
+        :param tags: дополнительные теги документа, например id вложенных документов
+        """
+        if not docs:
+            return
+        async with self.client.pipeline(transaction=False) as pipe:
+            for _id, doc in docs.items():
+                key = document_key(index, _id)
+                pipe.set(key, orjson.dumps(doc), ex=self.expire)
+                add_to_tags(pipe, key, {id_tag(_id), index_tag(index), *(tags(doc) if tags else ())})
+            await pipe.execute()
+
+
+document_cache: DocumentCache = DocumentCache(redis, settings.cache.DOCUMENT_EXPIRE_IN_SECONDS)
 
 
-async def get_cache_instance() -> CacheProtocol:
-    return redis
+async def get_document_cache() -> DocumentCache:
+    return document_cache
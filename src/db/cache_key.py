@@ -0,0 +1,101 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from starlette.datastructures import Headers, QueryParams
+from starlette.types import Scope
+
+from core.auth import decode_permissions, get_permission_tier
+from core.config import settings
+
+KEY_PREFIX = 'cache:'
+# Статистика обращений для прогрева хранится вне KEY_PREFIX и переживает полную очистку кеша
+WARMING_KEY_PREFIX = 'warming:'
+
+
+class CacheKeyBuilder:
+    """
+    Построение ключа кеша по каноническому виду запроса: путь без хоста и завершающего слэша,
+    отсортированные query параметры без значений по умолчанию, нормализованные поисковые запросы
+    и уровень доступа пользователя для путей из PERMISSION_AWARE_PREFIXES.
+    """
+
+    def __init__(self, defaults: dict[str, str] | None = None):
+        """
+        :param defaults: значения query параметров по умолчанию, которые не влияют на ответ
+        """
+        self.defaults = defaults or {}
+
+    def canonical(self, scope: Scope) -> str:
+        """
+        Канонический вид запроса. Разрешения из токена сохраняются в request.state и повторно не разбираются.
+        :param scope: ASGI scope запроса
+        :return: строка вида '<уровень доступа>:<путь>?<query>'
+        """
+        path = scope['path'].rstrip('/') or '/'
+        normalized_params = settings.cache.NORMALIZED_QUERY_PARAMS.get(path, ())
+        params = []
+        for name, value in QueryParams(scope['query_string']).multi_items():
+            if name in normalized_params:
+                value = value.strip().lower()
+            if self.defaults.get(name) != value:
+                params.append((name, value))
+        params.sort()
+        tier = ''
+        if path.startswith(tuple(settings.cache.PERMISSION_AWARE_PREFIXES)):
+            permissions = decode_permissions(Headers(scope=scope).get('authorization'))
+            scope.setdefault('state', {})['permissions'] = permissions
+            tier = get_permission_tier(permissions).name
+        return f'{tier}:{path}?{urlencode(params)}'
+
+    def build(self, scope: Scope) -> str:
+        """
+        Ключ кеша фиксированной длины для запроса.
+        :param scope: ASGI scope запроса
+        :return: ключ кеша
+        """
+        return entry_key(self.canonical(scope))
+
+
+def entry_key(canonical: str) -> str:
+    digest = hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+    return f'{KEY_PREFIX}entry:{digest}'
+
+
+def document_key(index: str, _id: str) -> str:
+    return f'{KEY_PREFIX}doc:{index}:{_id}'
+
+
+def page_key(name: str) -> str:
+    return f'{KEY_PREFIX}page:{name}'
+
+
+def tag_key(tag: str, bucket: int | None = None) -> str:
+    """
+    Ключ множества ключей кеша с тегом. Множества ведутся по периодам длиной settings.cache.max_expire:
+    множество пополняется только в свой период и истекает после него, поэтому не растёт без ограничения.
+    :param tag: тег
+    :param bucket: номер периода, по умолчанию текущий
+    :return: ключ множества
+    """
+    bucket = tag_bucket() if bucket is None else bucket
+    return f'{KEY_PREFIX}tag:{tag}:{bucket}'
+
+
+def tag_keys(tag: str) -> list[str]:
+    """
+    Ключи множеств, в которых могут быть живые записи с тегом: запись живёт не дольше max_expire,
+    поэтому она добавлена в текущем или предыдущем периоде.
+    :param tag: тег
+    :return: ключи множеств
+    """
+    bucket = tag_bucket()
+    return [tag_key(tag, bucket - 1), tag_key(tag, bucket)]
+
+
+def tag_bucket() -> int:
+    return int(time.time() // settings.cache.max_expire)
+
+
+def warming_key(name: str) -> str:
+    return f'{WARMING_KEY_PREFIX}{name}'
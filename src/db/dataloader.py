@@ -0,0 +1,98 @@
+import asyncio
+
+from elasticsearch import AsyncElasticsearch, ElasticsearchException
+
+from core.background import BackgroundTasks
+from core.logger import logger as _logger
+
+logger = _logger(__name__)
+
+BatchKey = tuple[str, tuple[str, ...]]
+
+
+class DataLoader:
+    """
+    Объединение get по id, вызванных почти одновременно из разных запросов воркера,
+    в один _mget на индекс и набор полей _source.
+    """
+
+    def __init__(self, client: AsyncElasticsearch, window: float, max_batch_size: int):
+        """
+        :param client: клиент Elasticsearch
+        :param window: время накопления пачки в секундах; 0 - до следующей итерации event loop
+        :param max_batch_size: размер пачки, при котором она отправляется не дожидаясь окна
+        """
+        self.client = client
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._batches: dict[BatchKey, dict[str, list[asyncio.Future]]] = {}
+        self._handle: asyncio.Handle | None = None
+        self._tasks = BackgroundTasks()
+
+    async def load(self, index: str, _id: str, source: list[str] | None = None) -> dict:
+        """
+        Получение документа в составе ближайшей пачки.
+        :param index: название индекса в elasticsearch
+        :param _id: id документа
+        :param source: поля _source, которые нужно вернуть; по умолчанию все
+        :return: документ в формате ответа get; без found=True для несуществующего id или индекса
+        """
+        loop = asyncio.get_running_loop()
+        key = (index, tuple(source or ()))
+        batch = self._batches.setdefault(key, {})
+        future = loop.create_future()
+        batch.setdefault(_id, []).append(future)
+        if len(batch) >= self.max_batch_size:
+            self._dispatch(key)
+        elif self._handle is None:
+            self._handle = loop.call_later(self.window, self._flush) if self.window else loop.call_soon(self._flush)
+        return await future
+
+    async def stop(self):
+        """Отмена отправленных и ещё не отправленных пачек."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        for batch in self._batches.values():
+            self._cancel(batch)
+        self._batches.clear()
+        await self._tasks.stop()
+
+    def _flush(self):
+        self._handle = None
+        for key in list(self._batches):
+            self._dispatch(key)
+
+    def _dispatch(self, key: BatchKey):
+        self._tasks.schedule(self._fetch(key, self._batches.pop(key)))
+
+    async def _fetch(self, key: BatchKey, batch: dict[str, list[asyncio.Future]]):
+        try:
+            await self._load_batch(key, batch)
+        finally:
+            # Ожидающие get не должны зависнуть, если пачка отменена или упала с неожиданной ошибкой
+            self._cancel(batch)
+
+    async def _load_batch(self, key: BatchKey, batch: dict[str, list[asyncio.Future]]):
+        index, source = key
+        params = {'_source_includes': ','.join(source)} if source else {}
+        try:
+            response = await self.client.mget(body={'ids': list(batch)}, index=index, **params)
+        except ElasticsearchException as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        logger.debug('Loaded %s documents from index %s in one mget', len(batch), index)
+        for doc in response['docs']:
+            for future in batch.get(doc['_id'], []):
+                if not future.done():
+                    future.set_result(doc)
+
+    @staticmethod
+    def _cancel(batch: dict[str, list[asyncio.Future]]):
+        for futures in batch.values():
+            for future in futures:
+                if not future.done():
+                    future.cancel()
@@ -1,32 +1,125 @@
+from typing import AsyncIterator
+
 from elasticsearch import AsyncElasticsearch, NotFoundError
+from elasticsearch.helpers import async_scan
+from elasticsearch.serializer import JSONSerializer
 from elasticsearch_dsl import Search
 
 from core.config import settings
 from core.logger import logger as _logger
+from db.bloom import IdFilters
+from db.dataloader import DataLoader
+from db.tags import add_tags, id_tag, index_tag
 
 logger = _logger(__name__)
 
+
+class RawJSONSerializer(JSONSerializer):
+    """Сериализатор, оставляющий ответы Elasticsearch неразобранными."""
+
+    def loads(self, data: str) -> str:
+        return data
+
+
+def add_hit_tags(docs: dict):
+    """
+    Добавление тегов id найденных документов к ответу на текущий запрос.
+    :param docs: ответ elasticsearch на search
+    """
+    add_tags(*(id_tag(hit['_id']) for hit in docs['hits']['hits']))
+
+
 es: AsyncElasticsearch = AsyncElasticsearch(hosts=settings.elastic.hosts)
+es_raw: AsyncElasticsearch = AsyncElasticsearch(hosts=settings.elastic.hosts, serializer=RawJSONSerializer())
 
 
 class ElasticRepository:
-    def __init__(self, client: AsyncElasticsearch = es):
+    def __init__(
+        self,
+        client: AsyncElasticsearch = es,
+        raw_client: AsyncElasticsearch = es_raw,
+        id_filters: IdFilters | None = None,
+        loader: DataLoader | None = None,
+    ):
+        """
+        :param client: клиент Elasticsearch
+        :param raw_client: клиент Elasticsearch, возвращающий ответы без разбора JSON
+        :param id_filters: фильтры Блума с id документов; get по заведомо несуществующему id не идёт в Elasticsearch
+        :param loader: DataLoader, объединяющий одновременные get в один _mget
+        """
         self.client = client
+        self.raw_client = raw_client
+        self.id_filters = id_filters
+        self.loader = loader
 
-    async def get(self, index: str, _id: str) -> dict | None:
+    async def get(self, index: str, _id: str, source: list[str] | None = None) -> dict | None:
         """
         Получение данных из Elasticsearch по id.
         :param index: название индекса в elasticsearch
         :param _id: id документа
+        :param source: поля _source, которые нужно вернуть; по умолчанию все
         :return: Ответ elasticsearch в виде dict
         """
+        add_tags(index_tag(index), id_tag(_id))
+        if self.id_filters is not None and not self.id_filters.might_contain(index, _id):
+            logger.debug('Document with id: %s, in index: %s is rejected by bloom filter', _id, index)
+            return None
         try:
-            doc = await self.client.get(index, _id)
+            if self.loader is not None:
+                doc = await self.loader.load(index, _id, source)
+            else:
+                params = {'_source_includes': ','.join(source)} if source else {}
+                doc = await self.client.get(index, _id, **params)
         except NotFoundError:
-            logger.info('Trying to get non-existent document with id: %s, in index: %s', _id, index)
+            doc = None
+        if doc is not None and 'error' in doc:
+            logger.info('Failed to get document with id: %s, in index: %s\n%s', _id, index, doc['error'])
+        # Элемент ответа _mget для несуществующего индекса содержит error и не содержит found
+        if doc is None or not doc.get('found'):
+            logger.debug('Trying to get non-existent document with id: %s, in index: %s', _id, index)
             return None
         return doc
 
+    async def get_raw(self, index: str, _id: str, source: list[str]) -> bytes | None:
+        """
+        Получение данных из Elasticsearch по id без разбора ответа.
+        :param index: название индекса в elasticsearch
+        :param _id: id документа
+        :param source: поля _source, которые нужно вернуть
+        :return: Ответ elasticsearch с filter_path=_source в виде bytes
+        """
+        add_tags(index_tag(index), id_tag(_id))
+        if self.id_filters is not None and not self.id_filters.might_contain(index, _id):
+            logger.debug('Document with id: %s, in index: %s is rejected by bloom filter', _id, index)
+            return None
+        try:
+            doc = await self.raw_client.get(index, _id, _source_includes=','.join(source), filter_path='_source')
+        except NotFoundError:
+            logger.debug('Trying to get non-existent document with id: %s, in index: %s', _id, index)
+            return None
+        return doc.encode()
+
+    async def mget(self, index: str, ids: list[str], source: list[str] | None = None) -> list[dict]:
+        """
+        Получение нескольких документов из Elasticsearch по id одним запросом.
+        :param index: название индекса в elasticsearch
+        :param ids: id документов
+        :param source: поля _source, которые нужно вернуть; по умолчанию все
+        :return: найденные документы в порядке ids
+        """
+        if not ids:
+            return []
+        add_tags(index_tag(index))
+        params = {'_source_includes': ','.join(source)} if source else {}
+        try:
+            response = await self.client.mget(body={'ids': ids}, index=index, **params)
+        except NotFoundError:
+            logger.debug('No documents found for ids in index: %s', index)
+            return []
+        docs = [doc for doc in response['docs'] if doc.get('found')]
+        add_tags(*(id_tag(doc['_id']) for doc in docs))
+        return docs
+
     async def get_multi(self, index: str, search: Search = None) -> dict | None:
         """
         Получение всех данных индекса из Elasticsearch.
@@ -41,11 +134,13 @@ class ElasticRepository:
             }
         else:
             body = search.to_dict()
+        add_tags(index_tag(index))
         try:
             doc = await self.client.search(index=index, body=body)
         except NotFoundError:
             logger.info('No results found for all query in index: %s', index)
             return None
+        add_hit_tags(doc)
         return doc
 
     async def search(self, index: str, search: Search) -> dict | None:
@@ -55,10 +150,73 @@ class ElasticRepository:
         :param search: Объект класса Search
         :return: Ответ elasticsearch в виде dict
         """
+        add_tags(index_tag(index))
         try:
             query = search.to_dict()
             docs = await self.client.search(index=index, body=query)
         except NotFoundError:
             logger.info('No results found for query: \n%s\nIn index: %s', search.to_dict(), index)
             return None
+        add_hit_tags(docs)
+        return docs
+
+    async def msearch(self, searches: list[tuple[str, Search]]) -> list[dict | None]:
+        """
+        Выполнение нескольких запросов за один вызов _msearch.
+        :param searches: пары из названия индекса и объекта класса Search
+        :return: Ответы elasticsearch в виде dict в порядке searches, None для запросов с ошибкой
+        """
+        if not searches:
+            return []
+        body = []
+        for index, search in searches:
+            add_tags(index_tag(index))
+            body.extend([{'index': index}, search.to_dict()])
+        response = await self.client.msearch(body=body)
+        docs = []
+        for (index, search), doc in zip(searches, response['responses']):
+            if 'error' in doc:
+                logger.info('Query failed: \n%s\nIn index: %s\n%s', search.to_dict(), index, doc['error'])
+                doc = None
+            else:
+                add_hit_tags(doc)
+            docs.append(doc)
         return docs
+
+    async def search_raw(self, index: str, search: Search) -> bytes | None:
+        """
+        Получение данных из Elasticsearch по определенному запросу без разбора ответа.
+        :param index: название индекса в elasticsearch
+        :param search: Объект класса Search с заданным source
+        :return: Ответ elasticsearch с filter_path=hits.hits._id,hits.hits._source,hits.hits.sort в виде bytes;
+            теги id документов добавляет вызывающий код после разбора passthrough.hits
+        """
+        add_tags(index_tag(index))
+        try:
+            docs = await self.raw_client.search(
+                index=index,
+                body=search.to_dict(),
+                filter_path='hits.hits._id,hits.hits._source,hits.hits.sort',
+            )
+        except NotFoundError:
+            logger.info('No results found for query: \n%s\nIn index: %s', search.to_dict(), index)
+            return None
+        return docs.encode()
+
+    async def count(self, index: str) -> int:
+        """
+        Количество документов в индексе.
+        :param index: название индекса в elasticsearch
+        :return: количество документов
+        """
+        response = await self.client.count(index=index)
+        return response['count']
+
+    async def scan_ids(self, index: str) -> AsyncIterator[str]:
+        """
+        Перебор id всех документов индекса через scroll без загрузки _source.
+        :param index: название индекса в elasticsearch
+        :return: асинхронный итератор id
+        """
+        async for hit in async_scan(self.client, index=index, query={'_source': False}):
+            yield hit['_id']
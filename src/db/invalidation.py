@@ -0,0 +1,97 @@
+import asyncio
+import contextlib
+import uuid
+from typing import Callable
+
+import aioredis
+import orjson
+
+from core.config import settings
+from core.logger import logger as _logger
+from db.redis import redis
+
+logger = _logger(__name__)
+
+InvalidationHandler = Callable[[dict], None]
+
+
+class InvalidationListener:
+    """Подписка на канал Redis с сообщениями об инвалидации кеша, общими для всех воркеров."""
+
+    RECONNECT_DELAY_IN_SECONDS = 1
+
+    def __init__(self, client: aioredis.Redis, channel: str = settings.cache.INVALIDATION_CHANNEL):
+        """
+        :param client: клиент Redis
+        :param channel: название канала
+        """
+        self.client = client
+        self.channel = channel
+        self.handlers: list[InvalidationHandler] = []
+        self.sender = uuid.uuid4().hex
+        self._task: asyncio.Task | None = None
+
+    def add_handler(self, handler: InvalidationHandler):
+        self.handlers.append(handler)
+
+    async def publish(self, message: dict):
+        """
+        Рассылка сообщения об инвалидации всем воркерам. Обработчики текущего воркера вызываются сразу,
+        до возврата из publish, а его собственное сообщение из канала пропускается.
+        :param message: сообщение, например {'action': 'flush'}
+        """
+        self._dispatch(message)
+        await self.client.publish(self.channel, orjson.dumps({**message, 'sender': self.sender}))
+
+    def start(self):
+        if self._task is None and self.handlers:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self.channel)
+                try:
+                    async for message in pubsub.listen():
+                        if (data := self._parse(message['data'])) is not None and data.get('sender') != self.sender:
+                            self._dispatch(data)
+                finally:
+                    await pubsub.close()
+            except aioredis.RedisError as e:
+                logger.warning('Invalidation channel %s is unavailable: %s', self.channel, e)
+                await asyncio.sleep(self.RECONNECT_DELAY_IN_SECONDS)
+
+    @staticmethod
+    def _parse(data: bytes) -> dict | None:
+        """
+        Разбор сообщения из канала. Некорректное сообщение пропускается, не останавливая подписку.
+        :param data: тело сообщения
+        :return: сообщение или None
+        """
+        try:
+            message = orjson.loads(data)
+        except orjson.JSONDecodeError:
+            message = None
+        if not isinstance(message, dict):
+            logger.warning('Malformed invalidation message is skipped: %r', data)
+            return None
+        return message
+
+    def _dispatch(self, message: dict):
+        for handler in self.handlers:
+            try:
+                handler(message)
+            except (AttributeError, KeyError, TypeError, ValueError):
+                logger.exception('Invalidation handler %s failed on message: %s', handler, message)
+
+
+listener: InvalidationListener = InvalidationListener(redis)
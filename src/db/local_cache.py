@@ -0,0 +1,77 @@
+import time
+from collections import OrderedDict
+from typing import Any
+
+from core.config import settings
+
+
+class LocalCache:
+    """LRU кеш в памяти процесса с ограничением по числу записей, суммарному размеру и времени жизни."""
+
+    def __init__(self, max_entries: int, max_bytes: int, expire: int):
+        """
+        :param max_entries: максимальное количество записей
+        :param max_bytes: максимальный суммарный размер записей в байтах
+        :param expire: время жизни записи в секундах
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.expire = expire
+        self._entries: OrderedDict[str, tuple[float, int, Any]] = OrderedDict()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any | None:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, _, value = item
+        if expires_at < time.monotonic():
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, size: int):
+        """
+        Запись значения в кеш с вытеснением давно неиспользуемых записей.
+        :param key: ключ
+        :param value: значение
+        :param size: размер значения в байтах
+        """
+        if size > self.max_bytes:
+            return
+        self.delete(key)
+        self._entries[key] = (time.monotonic() + self.expire, size, value)
+        self._size += size
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._size -= evicted_size
+
+    def delete(self, key: str):
+        item = self._entries.pop(key, None)
+        if item is not None:
+            self._size -= item[1]
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+    def on_invalidation(self, message: dict):
+        """Обработчик сообщений InvalidationListener."""
+        if message.get('action') == 'flush':
+            self.clear()
+        elif message.get('action') == 'invalidate':
+            for key in message.get('keys', []):
+                self.delete(key)
+
+
+local_cache: LocalCache | None = None
+if settings.cache.LOCAL_ENABLED:
+    local_cache = LocalCache(
+        max_entries=settings.cache.LOCAL_MAX_ENTRIES,
+        max_bytes=settings.cache.LOCAL_MAX_BYTES,
+        expire=min(settings.cache.LOCAL_EXPIRE_IN_SECONDS, settings.FILM_CACHE_EXPIRE_IN_SECONDS),
+    )
@@ -0,0 +1,74 @@
+"""
+Сборка тела HTTP ответа из сырого ответа Elasticsearch без разбора JSON.
+
+Ответ запрашивается с filter_path и _source_includes, поэтому Elasticsearch отдаёт компактный JSON
+фиксированной структуры, а _source проецируемых документов не содержит ключей _source и sort.
+"""
+import orjson
+
+SOURCE_PREFIX = b'{"_source":'
+HITS_PREFIX = b'{"hits":{"hits":['
+HITS_SUFFIX = b'}]}}'
+ID_PREFIX = b'{"_id":"'
+SOURCE_KEY = b'","_source":'
+HITS_SEPARATOR = b'},' + ID_PREFIX
+SORT_KEY = b',"sort":'
+
+
+def source(raw: bytes) -> bytes | None:
+    """
+    _source из ответа на get с filter_path=_source.
+    :param raw: ответ elasticsearch
+    :return: байты объекта _source
+    """
+    if not raw.startswith(SOURCE_PREFIX):
+        return None
+    start = len(SOURCE_PREFIX)
+    return raw[start:-1]
+
+
+def hits(raw: bytes) -> list[tuple[str, bytes, bytes | None]]:
+    """
+    _id, _source и sort каждого документа из ответа на search
+    с filter_path=hits.hits._id,hits.hits._source,hits.hits.sort.
+    :param raw: ответ elasticsearch
+    :return: список из id, байтов _source и байтов sort (None, если поиск без сортировки)
+    """
+    if not raw.startswith(HITS_PREFIX):
+        return []
+    start = len(HITS_PREFIX) + len(ID_PREFIX)
+    stop = len(raw) - len(HITS_SUFFIX)
+    result = []
+    for hit in raw[start:stop].split(HITS_SEPARATOR):
+        _id, _, hit = hit.partition(SOURCE_KEY)
+        _source, separator, sort = hit.rpartition(SORT_KEY)
+        result.append((_id.decode(), _source, sort) if separator else (_id.decode(), hit, None))
+    return result
+
+
+def rename_fields(body: bytes, renames: dict[str, str]) -> bytes:
+    """
+    Переименование ключей JSON, например id в uuid, на любом уровне вложенности.
+    :param body: компактный JSON
+    :param renames: новые имена ключей
+    """
+    for name, new_name in renames.items():
+        body = body.replace(f'"{name}":'.encode(), f'"{new_name}":'.encode())
+    return body
+
+
+def json_array(sources: list[bytes], renames: dict[str, str]) -> bytes:
+    """
+    JSON массив из байтов _source документов.
+    :param sources: байты _source
+    :param renames: новые имена ключей
+    """
+    return rename_fields(b'[' + b','.join(sources) + b']', renames)
+
+
+def json_object(values: dict[str, bytes]) -> bytes:
+    """
+    JSON объект из готовых байтов значений.
+    :param values: байты значений по ключам
+    """
+    return b'{' + b','.join(orjson.dumps(name) + b':' + value for name, value in values.items()) + b'}'
@@ -1,7 +1,10 @@
 from typing import Protocol
 
+from core.config import settings
 from core.logger import logger as _logger
-from db.elastic import ElasticRepository
+from db.bloom import id_filters
+from db.dataloader import DataLoader
+from db.elastic import ElasticRepository, es
 
 logger = _logger(__name__)
 
@@ -10,14 +13,37 @@ class Repository(Protocol):
     async def get(self, *args, **kwargs) -> dict | None:
         ...
 
+    async def get_raw(self, *args, **kwargs) -> bytes | None:
+        ...
+
+    async def mget(self, *args, **kwargs) -> list[dict]:
+        ...
+
     async def get_multi(self, *args, **kwargs) -> dict | None:
         ...
 
     async def search(self, *args, **kwargs) -> dict | None:
         ...
 
+    async def search_raw(self, *args, **kwargs) -> bytes | None:
+        ...
+
+    async def msearch(self, *args, **kwargs) -> list[dict | None]:
+        ...
+
+
+loader: DataLoader | None = None
+if settings.elastic.GET_BATCH_ENABLED:
+    loader = DataLoader(
+        client=es,
+        window=settings.elastic.GET_BATCH_WINDOW_IN_MICROSECONDS / 1_000_000,
+        max_batch_size=settings.elastic.GET_BATCH_MAX_SIZE,
+    )
 
-database: Repository = ElasticRepository()
+database: Repository = ElasticRepository(
+    id_filters=id_filters if settings.bloom.ENABLED else None,
+    loader=loader,
+)
 
 
 async def get_repository() -> Repository:
@@ -0,0 +1,23 @@
+from contextvars import ContextVar
+
+request_tags: ContextVar[set[str] | None] = ContextVar('request_tags', default=None)
+
+INDEX_TAG_PREFIX = 'index:'
+ID_TAG_PREFIX = 'id:'
+
+
+def index_tag(index: str) -> str:
+    return f'{INDEX_TAG_PREFIX}{index}'
+
+
+def id_tag(_id: str) -> str:
+    return f'{ID_TAG_PREFIX}{_id}'
+
+
+def add_tags(*tags: str):
+    """
+    Добавление тегов к ответу на текущий запрос. Вне CacheMiddleWare ничего не делает.
+    :param tags: теги
+    """
+    if (current_tags := request_tags.get()) is not None:
+        current_tags.update(tags)
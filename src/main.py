@@ -2,12 +2,15 @@ import uvicorn
 from elasticsearch import AsyncElasticsearch
 from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
 
-from api.v1 import films, genres, persons, services
+from api.v1 import films, genres, pages, persons, services
+from api.v1.utils import PaginatedParams, get_query_defaults
 from core.config import settings
 from core.logger import LOGGING
-from db import cache, elastic, redis
+from db import bloom, cache, elastic, invalidation, local_cache, redis, repository
+from db.cache_key import CacheKeyBuilder
+from services.film import FilmService, film_pages
+from services.genre import genre_catalogue
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -16,24 +19,55 @@ app = FastAPI(
     default_response_class=ORJSONResponse,
 )
 
-cache_middleware = cache.CacheMiddleWare(redis.redis)
-app.add_middleware(BaseHTTPMiddleware, dispatch=cache_middleware)
+app.add_middleware(
+    cache.CacheMiddleWare,
+    client=redis.redis,
+    local_cache=local_cache.local_cache,
+    key_builder=CacheKeyBuilder(defaults=get_query_defaults(PaginatedParams)),
+    warmer=cache.cache_warmer if settings.cache_warming.ENABLED else None,
+    background_tasks=cache.revalidation_tasks,
+)
 
 
 @app.on_event('startup')
 async def startup():
     elastic.es = AsyncElasticsearch(hosts=settings.elastic.hosts)
+    if local_cache.local_cache is not None:
+        invalidation.listener.add_handler(local_cache.local_cache.on_invalidation)
+    if settings.bloom.ENABLED:
+        bloom.id_filters.start(repository.database)
+        invalidation.listener.add_handler(bloom.id_filters.on_invalidation)
+    if settings.genre_catalogue.ENABLED:
+        genre_catalogue.start(repository.database)
+        invalidation.listener.add_handler(genre_catalogue.on_invalidation)
+    if settings.film_pages.ENABLED:
+        film_pages.start(FilmService(repository.database, cache.document_cache, genre_catalogue, film_pages))
+    if settings.cache_warming.ENABLED:
+        cache.cache_warmer.start(app, warm=settings.cache_warming.ON_STARTUP)
+        if settings.cache_warming.ON_FLUSH:
+            invalidation.listener.add_handler(cache.cache_warmer.on_invalidation)
+    invalidation.listener.start()
 
 
 @app.on_event('shutdown')
 async def shutdown():
+    await invalidation.listener.stop()
+    await cache.revalidation_tasks.stop()
+    if repository.loader is not None:
+        await repository.loader.stop()
+    await bloom.id_filters.stop()
+    await genre_catalogue.stop()
+    await film_pages.stop()
+    await cache.cache_warmer.stop()
     await redis.redis.close()
     await elastic.es.close()
+    await elastic.es_raw.close()
 
 
 app.include_router(films.router, prefix='/api/v1/films', tags=['films'])
 app.include_router(genres.router, prefix='/api/v1/genres', tags=['genres'])
 app.include_router(persons.router, prefix='/api/v1/persons', tags=['persons'])
+app.include_router(pages.router, prefix='/api/v1/pages', tags=['pages'])
 app.include_router(services.router, prefix='/api/v1/services', tags=['services'])
 
 
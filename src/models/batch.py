@@ -0,0 +1,10 @@
+from pydantic.fields import Field
+
+from core.config import settings
+from models.utils import DefaultModel
+
+
+class BatchRequest(DefaultModel):
+    """Список id документов для пакетного получения."""
+
+    ids: list[str] = Field(..., min_items=1, max_items=settings.elastic.MAX_BATCH_IDS)
@@ -0,0 +1,20 @@
+from models.utils import DefaultModel
+
+
+class InvalidateRequest(DefaultModel):
+    """Теги для инвалидации кеша: id документов и названия индексов Elasticsearch."""
+
+    ids: list[str] = []
+    indices: list[str] = []
+
+
+class InvalidateResponse(DefaultModel):
+    """Количество удалённых записей кеша."""
+
+    invalidated: int
+
+
+class WarmResponse(DefaultModel):
+    """Количество запросов, ответы на которые получены при прогреве кеша."""
+
+    warmed: int
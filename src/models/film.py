@@ -1,3 +1,4 @@
+from enum import Enum
 from typing import Optional
 
 from pydantic.fields import Field
@@ -7,6 +8,11 @@ from models.person import PersonResponse
 from models.utils import DefaultModel
 
 
+class SortEnum(str, Enum):
+    desc_rating = '-imdb_rating'
+    asc_rating = 'imdb_rating'
+
+
 class ESFilmPerson(DefaultModel):
 
     uuid: str = Field(..., alias='id')
@@ -19,6 +25,14 @@ class ESFilmGenre(DefaultModel):
     name: str
 
 
+class ESFilmShort(DefaultModel):
+    """Поля документа фильма в Elasticsearch, нужные для списков фильмов."""
+
+    uuid: str = Field(..., alias='id')
+    title: str
+    imdb_rating: float
+
+
 class ESFilm(DefaultModel):
     """Модель описывающая document в Elasticserch."""
 
@@ -0,0 +1,40 @@
+from enum import Enum
+from uuid import UUID
+
+from pydantic import validator
+from pydantic.fields import Field
+
+from core.config import settings
+from models.film import FilmResponse, SortEnum
+from models.genre import DetailGenreResponse
+from models.utils import DefaultModel
+
+
+class PageQueryType(str, Enum):
+    films = 'films'
+    genres = 'genres'
+
+
+class PageQuery(DefaultModel):
+    """Именованный запрос составной страницы: список фильмов или все жанры."""
+
+    name: str
+    query_type: PageQueryType = Field(..., alias='type')
+    sort: SortEnum = SortEnum.desc_rating
+    size: int = Field(50, ge=1, le=settings.elastic.MAX_RESULT_WINDOW)
+    genre: UUID | None = None
+
+
+class PageRequest(DefaultModel):
+    """Запросы составной страницы, выполняемые за одно обращение к Elasticsearch."""
+
+    queries: list[PageQuery] = Field(..., min_items=1, max_items=settings.elastic.MAX_PAGE_QUERIES)
+
+    @validator('queries')
+    def unique_names(cls, queries: list[PageQuery]) -> list[PageQuery]:
+        if len({query.name for query in queries}) != len(queries):
+            raise ValueError('query names must be unique')
+        return queries
+
+
+PageResponse = dict[str, list[FilmResponse] | list[DetailGenreResponse]]
@@ -12,3 +12,21 @@ class DefaultModel(BaseModel):
     class Config:
         json_loads = orjson.loads
         json_dumps = orjson_dumps
+
+
+def source_fields(model: type[BaseModel]) -> list[str]:
+    """Поля _source документа Elasticsearch, из которых строится модель."""
+    return [field.alias for field in model.__fields__.values()]
+
+
+def field_renames(model: type[BaseModel]) -> dict[str, str]:
+    """Имена полей модели для полей _source документа Elasticsearch, которые называются иначе."""
+    return {field.alias: field.name for field in model.__fields__.values() if field.alias != field.name}
+
+
+def supports_passthrough(model: type[BaseModel]) -> bool:
+    """
+    Можно ли отдавать _source документа без разбора: только если все поля модели обязательны.
+    Иначе поля, которых нет в _source, не попадут в ответ, а модель отдала бы их со значением null.
+    """
+    return all(field.required for field in model.__fields__.values())
@@ -1,22 +1,51 @@
 from functools import lru_cache
+from uuid import UUID
 
+import aioredis
+import orjson
+from elasticsearch import ElasticsearchException
 from elasticsearch_dsl import Q, Search
 from fastapi import Depends
 
+from core.background import BackgroundTasks
+from core.config import settings
 from core.logger import logger as _logger
+from db import passthrough
+from db.cache import CacheProtocol, DocumentCache, add_to_tags, get_document_cache
+from db.cache_key import page_key
+from db.redis import redis
 from db.repository import Repository, get_repository
-from models.film import ESFilm
-from core.config import settings
+from db.tags import add_tags, id_tag, index_tag
+from models.film import DetailFilmResponse, ESFilm, ESFilmShort, SortEnum
+from models.utils import field_renames, source_fields, supports_passthrough
+from services.genre import GenreCatalogue, GenreService, get_genre_catalogue
 
 logger = _logger(__name__)
 
+DETAIL_FIELDS = set(DetailFilmResponse.__fields__)
+# Вложенные жанры и персоны фильма, изменение которых меняет ответ с фильмом
+NESTED_FIELDS = ('genre', 'actors', 'writers', 'directors')
+DETAIL_SOURCE = [field.alias for name, field in ESFilm.__fields__.items() if name in DETAIL_FIELDS]
+
 
 class FilmService:
-    def __init__(self, repo: Repository):
+    def __init__(
+        self,
+        repo: Repository,
+        doc_cache: DocumentCache,
+        genres: GenreCatalogue,
+        pages: 'FilmPages | None' = None,
+    ):
         """
         :param repo:  класс реализущией интерфейс Repository
+        :param doc_cache: кеш отдельных документов
+        :param genres: снимок всех жанров, по которому проверяется фильтр по жанру
+        :param pages: заранее построенные первые страницы списков фильмов
         """
         self.repo = repo
+        self.doc_cache = doc_cache
+        self.genres = genres
+        self.pages = pages
 
     async def get_by_id(self, film_id: str, **kwargs) -> dict | None:
         """
@@ -27,44 +56,276 @@ class FilmService:
         doc = await self.repo.get('movies', film_id)
         if doc is None:
             return
-        data = ESFilm(**doc['_source']).dict()
+        data = ESFilm(**doc['_source']).dict(include=DETAIL_FIELDS)
+        add_tags(*self.nested_tags(data))
         logger.debug('[+] Return film from elastic. id:%s', film_id)
         # check permission
-        permissions = kwargs.get('permissions') if kwargs.get('permissions') else []
-        if data.get('only_sub') and (settings.permission.Subscriber not in permissions):
+        if not self._is_allowed(data, kwargs.get('permissions')):
             return None
         return data
 
-    async def get_by_search(self, **kwargs) -> list[dict] | None:
+    async def get_by_ids(self, film_ids: list[str], **kwargs) -> list[dict]:
+        """
+        Получение информации о нескольких фильмах через кеш отдельных документов.
+        :param film_ids: id фильмов
+        :return: Список объектов модели DetailFilmResponse в порядке film_ids
+        """
+        films = await self.doc_cache.get_many('movies', film_ids, self._fetch_by_ids, self.nested_tags)
+        logger.debug('[+] Return %s films by ids.', len(films))
+        return [film for film in films if self._is_allowed(film, kwargs.get('permissions'))]
+
+    async def _fetch_by_ids(self, film_ids: list[str]) -> dict[str, dict]:
+        docs = await self.repo.mget('movies', film_ids, source=DETAIL_SOURCE)
+        return {doc['_id']: ESFilm(**doc['_source']).dict(include=DETAIL_FIELDS) for doc in docs}
+
+    @staticmethod
+    def nested_tags(film: dict) -> list[str]:
+        """
+        Теги вложенных жанров и персон фильма: их изменение меняет и документ фильма.
+        :param film: объект модели DetailFilmResponse
+        """
+        return [id_tag(item['uuid']) for field in NESTED_FIELDS for item in film[field] or ()]
+
+    @classmethod
+    def _is_allowed(cls, film: dict, permissions: list | None) -> bool:
+        return not film.get('only_sub') or cls._is_subscriber(permissions)
+
+    @staticmethod
+    def _is_subscriber(permissions: list | None) -> bool:
+        return settings.permission.Subscriber in (permissions or [])
+
+    async def get_by_search(self, **kwargs) -> list[dict] | bytes | None:
         """
         Получение и запись списка данных о фильмах.
         :param kwargs: Параметры запроса
         :return: Список объектов модели FilmResponse
         """
-        start = (kwargs['page_num'] - 1) * kwargs['page_size']
-        stop = kwargs['page_size'] * kwargs['page_num']
-        search = Search(index='movies').query('match_all')[start:stop]
+        data, _ = await self.get_page(**kwargs)
+        return data
+
+    async def get_page(self, **kwargs) -> tuple[list[dict] | bytes | None, list | None]:
+        """
+        Получение страницы списка фильмов по номеру страницы или после search_after.
+        :param kwargs: Параметры запроса
+        :return: Список объектов модели FilmResponse (в режиме ES_PASSTHROUGH готовый JSON)
+            и значения сортировки для следующей страницы
+        """
+        if not await self.is_known_genre(kwargs.get('_filter')):
+            logger.debug('[-] Unknown genre in filter: %s', kwargs['_filter'])
+            return None, None
+        if self.pages is not None and (page := await self.pages.get(**kwargs)) is not None:
+            logger.debug('[+] Return materialized films page.')
+            return page
+        search = self.page_search(**kwargs)
+        if settings.elastic.PASSTHROUGH and supports_passthrough(ESFilmShort):
+            return await self._get_page_raw(search, kwargs.get('sort'), kwargs['page_size'])
+        docs = await self.repo.search('movies', search)
+        return self.parse_page(docs, kwargs.get('sort'), kwargs['page_size'])
+
+    async def is_known_genre(self, _filter: UUID | None) -> bool:
+        """
+        Проверка фильтра по жанру до построения запроса. Жанр из снимка принимается сразу; жанр, которого
+        в снимке нет, проверяется получением документа, а не поиском фильмов: снимок может отставать от индекса.
+        Ответ зависит от индекса жанров и инвалидируется вместе с ним.
+        :param _filter: id жанра из filter[genre]
+        """
+        if _filter is None or self.genres.body is None:
+            return True
+        add_tags(index_tag('genres'), id_tag(str(_filter)))
+        if self.genres.get(str(_filter)) is not None:
+            return True
+        if await self.repo.get('genres', str(_filter), source=['id']) is None:
+            return False
+        self.genres.request_rebuild()
+        return True
+
+    def page_search(self, **kwargs) -> Search:
+        """
+        Запрос страницы списка фильмов.
+        :param kwargs: Параметры запроса
+        :return: Объект класса Search
+        """
+        search = Search(index='movies').source(source_fields(ESFilmShort)).extra(track_total_hits=False)
+        if search_after := kwargs.get('search_after'):
+            search = search.extra(search_after=search_after, size=kwargs['page_size'])
+        else:
+            start = (kwargs['page_num'] - 1) * kwargs['page_size']
+            stop = kwargs['page_size'] * kwargs['page_num']
+            search = search[start:stop]
         if query := kwargs.get('query'):
             search = search.query('multi_match', query=query, fuzziness='auto')
         if sort := kwargs.get('sort'):
-            search = search.sort(sort)
+            search = search.sort(sort, 'id')
+        # Ограничения без влияния на релевантность идут в filter context: без подсчёта score и с кешем фильтров
+        if not self._is_subscriber(kwargs.get('permissions')):
+            search = search.exclude('term', only_sub=True)
         if _filter := kwargs.get('_filter'):
-            search = search.query('bool', should=[Q('nested', path='genre', query=Q('match', genre__id=_filter))])
-        docs = await self.repo.search('movies', search)
+            search = search.filter('nested', path='genre', query=Q('term', genre__id=str(_filter)))
+        return search
+
+    @staticmethod
+    def parse_page(docs: dict | None, sort: str | None, page_size: int) -> tuple[list[dict] | None, list | None]:
+        """
+        Разбор ответа на запрос из page_search.
+        :param docs: Ответ elasticsearch
+        :param sort: сортировка запроса
+        :param page_size: размер страницы
+        :return: Список объектов модели FilmResponse и значения сортировки для следующей страницы
+        """
         if docs is None:
-            return
-        data = [ESFilm(**row['_source']).dict() for row in docs['hits']['hits']]
+            return None, None
+        hits = docs['hits']['hits']
+        data = [ESFilmShort(**row['_source']).dict() for row in hits]
+        next_page = hits[-1]['sort'] if sort and len(hits) == page_size else None
         logger.debug('[+] Return films from elastic.')
-        return data
+        return data, next_page
+
+    async def _get_page_raw(self, search: Search, sort: str | None, page_size: int) -> tuple[bytes | None, list | None]:
+        raw = await self.repo.search_raw('movies', search)
+        rows = passthrough.hits(raw) if raw is not None else []
+        if not rows:
+            return None, None
+        add_tags(*(id_tag(_id) for _id, _, _ in rows))
+        next_page = orjson.loads(rows[-1][2]) if sort and len(rows) == page_size else None
+        logger.debug('[+] Return raw films from elastic.')
+        return passthrough.json_array([_source for _, _source, _ in rows], field_renames(ESFilmShort)), next_page
+
+
+class FilmPages:
+    """
+    Первые страницы списка фильмов для каждой сортировки, жанра и уровня доступа, заранее построенные в Redis.
+    Строятся в фоне одним воркером за период и удаляются CacheInvalidator по тегам фильмов и индекса.
+    """
+
+    def __init__(self, client: CacheProtocol, pages: int, page_size: int, refresh_interval: int):
+        """
+        :param client: клиент Redis
+        :param pages: количество первых страниц каждого списка
+        :param page_size: размер страницы
+        :param refresh_interval: период перестроения страниц в секундах
+        """
+        self.client = client
+        self.pages = pages
+        self.page_size = page_size
+        self.refresh_interval = refresh_interval
+        self._service: FilmService | None = None
+        self._tasks = BackgroundTasks()
+
+    async def get(self, **kwargs) -> tuple[bytes, list | None] | None:
+        """
+        Получение построенной страницы.
+        :param kwargs: Параметры запроса FilmService.get_page
+        :return: JSON списка объектов модели FilmResponse и значения сортировки для следующей страницы
+            или None, если страница не строится или ещё не построена
+        """
+        if kwargs.get('query') or kwargs.get('search_after') or not kwargs.get('sort'):
+            return None
+        if kwargs['page_size'] != self.page_size or kwargs['page_num'] > self.pages:
+            return None
+        subscriber = FilmService._is_subscriber(kwargs.get('permissions'))
+        key = self.key(kwargs['sort'], kwargs.get('_filter'), subscriber, kwargs['page_num'])
+        body, next_page, ids = await self.client.hmget(key, 'body', 'next', 'ids')
+        if body is None:
+            return None
+        add_tags(index_tag('movies'), *(id_tag(_id) for _id in orjson.loads(ids)))
+        return body, orjson.loads(next_page)
+
+    @staticmethod
+    def key(sort: str, genre: UUID | str | None, subscriber: bool, page_num: int) -> str:
+        return page_key(f'{SortEnum(sort).value}:{genre or ""}:{int(subscriber)}:{page_num}')
+
+    async def build(self):
+        """Построение всех страниц, если за текущий период их не построил другой воркер."""
+        if not await self.client.set(page_key('lock'), 1, nx=True, ex=self.refresh_interval):
+            return
+        genres = [None, *await self._genre_ids()]
+        for sort in SortEnum:
+            for genre in genres:
+                for subscriber in (False, True):
+                    await self._build_pages(sort, genre, subscriber)
+        logger.info('Films pages are materialized for %s genres', len(genres) - 1)
+
+    async def _genre_ids(self) -> list[str]:
+        if self._service.genres.body is not None:
+            return list(self._service.genres.genres)
+        docs = await self._service.repo.get_multi('genres', GenreService.multi_search())
+        return [genre['uuid'] for genre in GenreService.parse_multi(docs)]
+
+    async def _build_pages(self, sort: SortEnum, genre: str | None, subscriber: bool):
+        permissions = [settings.permission.Subscriber] if subscriber else []
+        search_after = None
+        page_nums = iter(range(1, self.pages + 1))
+        async with self.client.pipeline(transaction=False) as pipe:
+            for page_num in page_nums:
+                search = self._service.page_search(
+                    sort=sort.value,
+                    page_num=page_num,
+                    page_size=self.page_size,
+                    search_after=search_after,
+                    _filter=genre,
+                    permissions=permissions,
+                )
+                data, search_after = self._service.parse_page(
+                    await self._service.repo.search('movies', search),
+                    sort.value,
+                    self.page_size,
+                )
+                if not data:
+                    pipe.unlink(self.key(sort, genre, subscriber, page_num))
+                    break
+                self._store(pipe, self.key(sort, genre, subscriber, page_num), data, search_after)
+                if search_after is None:
+                    break
+            # Страницы за концом списка могли остаться от прошлого построения
+            for page_num in page_nums:
+                pipe.unlink(self.key(sort, genre, subscriber, page_num))
+            await pipe.execute()
+
+    def _store(self, pipe, key: str, data: list[dict], next_page: list | None):
+        ids = [film['uuid'] for film in data]
+        pipe.hset(key, mapping={'body': orjson.dumps(data), 'next': orjson.dumps(next_page), 'ids': orjson.dumps(ids)})
+        pipe.expire(key, 2 * self.refresh_interval)
+        add_to_tags(pipe, key, {index_tag('movies'), *(id_tag(_id) for _id in ids)})
+
+    def start(self, service: 'FilmService'):
+        self._service = service
+        self._tasks.start(self._rebuild, self.refresh_interval)
+
+    async def stop(self):
+        await self._tasks.stop()
+
+    async def _rebuild(self):
+        try:
+            await self.build()
+        except (aioredis.RedisError, ElasticsearchException):
+            logger.exception('Failed to materialize films pages')
+
+
+film_pages: FilmPages = FilmPages(
+    client=redis,
+    pages=settings.film_pages.PAGES,
+    page_size=settings.film_pages.PAGE_SIZE,
+    refresh_interval=settings.film_pages.REFRESH_INTERVAL_IN_SECONDS,
+)
+
+
+async def get_film_pages() -> FilmPages | None:
+    return film_pages if settings.film_pages.ENABLED else None
 
 
 @lru_cache()
 def get_film_service(
     repo: Repository = Depends(get_repository),
+    doc_cache: DocumentCache = Depends(get_document_cache),
+    genres: GenreCatalogue = Depends(get_genre_catalogue),
+    pages: FilmPages | None = Depends(get_film_pages),
 ) -> FilmService:
     """
     Провайдер для FilmService.
     :param repo: класс реализующий интерфейс Repository
+    :param doc_cache: кеш отдельных документов
+    :param genres: снимок всех жанров
+    :param pages: заранее построенные первые страницы списков фильмов
     :return: Объект класса FilmService для API.
     """
-    return FilmService(repo)
+    return FilmService(repo, doc_cache, genres, pages)
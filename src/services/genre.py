@@ -1,54 +1,220 @@
 from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping
 
+import orjson
+from elasticsearch import ElasticsearchException
+from elasticsearch_dsl import Search
 from fastapi import Depends
 
+from core.background import BackgroundTasks
+from core.config import settings
 from core.logger import logger as _logger
+from db import passthrough
+from db.cache import DocumentCache, get_document_cache
 from db.repository import Repository, get_repository
+from db.tags import ID_TAG_PREFIX, add_tags, id_tag, index_tag
 from models.genre import ESGenre
+from models.utils import field_renames, source_fields, supports_passthrough
 
 logger = _logger(__name__)
 
 
 class GenreService:
-    def __init__(self, repo: Repository):
+    def __init__(self, repo: Repository, doc_cache: DocumentCache, catalogue: 'GenreCatalogue'):
         """
         :param repo: класс реализующий интерфейс Repository.
+        :param doc_cache: кеш отдельных документов
+        :param catalogue: снимок всех жанров в памяти процесса
         """
         self.repo = repo
+        self.doc_cache = doc_cache
+        self.catalogue = catalogue
 
-    async def get(self, uuid: str) -> dict | None:
+    async def get(self, uuid: str) -> dict | bytes | None:
         """
         Получение информации о конкретном жанре
         :param uuid: id жанра в БД
-        :return: Объект модели DetailGenre
+        :return: Объект модели DetailGenre, из каталога или в режиме ES_PASSTHROUGH
+            (если все поля ESGenre обязательны) готовый JSON
         """
-        doc = await self.repo.get('genres', uuid)
-        if doc is None:
+        if (data := self.catalogue.get(uuid)) is not None:
+            add_tags(index_tag('genres'), id_tag(uuid))
+            logger.debug('[+] Return genre from catalogue. uuid:%s', uuid)
+            return data
+        if settings.elastic.PASSTHROUGH and supports_passthrough(ESGenre):
+            data = await self._get_raw(uuid)
+        elif (doc := await self.repo.get('genres', uuid)) is not None:
+            data = ESGenre(**doc['_source']).dict()
+        if data is None:
             return
-        data = ESGenre(**doc['_source']).dict()
+        self.catalogue.request_rebuild()
         logger.debug('[+] Return genre from elastic. uuid:%s', uuid)
         return data
 
-    async def get_multi(self) -> list[dict] | None:
+    async def get_by_ids(self, genre_ids: list[str]) -> list[dict]:
+        """
+        Получение информации о нескольких жанрах через кеш отдельных документов.
+        :param genre_ids: id в БД
+        :return: Список объектов модели DetailGenre в порядке genre_ids
+        """
+        data = await self.doc_cache.get_many('genres', genre_ids, self._fetch_by_ids)
+        logger.debug('[+] Return %s genres by ids.', len(data))
+        return data
+
+    async def _fetch_by_ids(self, genre_ids: list[str]) -> dict[str, dict]:
+        docs = await self.repo.mget('genres', genre_ids, source=source_fields(ESGenre))
+        return {doc['_id']: ESGenre(**doc['_source']).dict() for doc in docs}
+
+    async def get_multi(self) -> list[dict] | bytes | None:
         """
         Получение информации о всех жанрах.
+        :return: Список объектов модели DetailGenre, из каталога или в режиме ES_PASSTHROUGH
+            (если все поля ESGenre обязательны) готовый JSON
+        """
+        if self.catalogue.body is not None:
+            add_tags(index_tag('genres'), *(id_tag(uuid) for uuid in self.catalogue.genres))
+            logger.debug('[+] Return genres from catalogue.')
+            return self.catalogue.body
+        if settings.elastic.PASSTHROUGH and supports_passthrough(ESGenre):
+            return await self._get_multi_raw()
+        docs = await self.repo.get_multi('genres', self.multi_search())
+        return self.parse_multi(docs)
+
+    @staticmethod
+    def multi_search() -> Search:
+        """
+        Запрос всех жанров.
+        :return: Объект класса Search
+        """
+        return Search(index='genres').query('match_all').source(source_fields(ESGenre)).extra(size=10_000)
+
+    @staticmethod
+    def parse_multi(docs: dict | None) -> list[dict]:
+        """
+        Разбор ответа на запрос из multi_search.
+        :param docs: Ответ elasticsearch
         :return: Список объектов модели DetailGenre
         """
-        docs = await self.repo.get_multi('genres')
         if docs is None:
             return []
         data = [ESGenre(**row['_source']).dict() for row in docs['hits']['hits']]
         logger.debug('[+] Return genres from elastic.')
         return data
 
+    async def _get_raw(self, uuid: str) -> bytes | None:
+        raw = await self.repo.get_raw('genres', uuid, source=source_fields(ESGenre))
+        data = passthrough.source(raw) if raw is not None else None
+        if data is None:
+            return
+        logger.debug('[+] Return raw genre from elastic. uuid:%s', uuid)
+        return passthrough.rename_fields(data, field_renames(ESGenre))
+
+    async def _get_multi_raw(self) -> bytes:
+        raw = await self.repo.search_raw('genres', self.multi_search())
+        rows = passthrough.hits(raw) if raw is not None else []
+        add_tags(*(id_tag(_id) for _id, _, _ in rows))
+        logger.debug('[+] Return raw genres from elastic.')
+        return passthrough.json_array([_source for _, _source, _ in rows], field_renames(ESGenre))
+
+
+class GenreCatalogue:
+    """
+    Неизменяемый снимок индекса жанров в памяти процесса с заранее сериализованными ответами.
+    Строится при старте сервиса, перестраивается по таймеру и по сообщениям об инвалидации жанров.
+    Снимок может отставать от индекса, поэтому отсутствие жанра в нём не значит, что жанра нет.
+    """
+
+    def __init__(self, refresh_interval: int):
+        """
+        :param refresh_interval: период перестроения снимка в секундах
+        """
+        self.refresh_interval = refresh_interval
+        self.genres: Mapping[str, bytes] = MappingProxyType({})
+        self.body: bytes | None = None
+        self._repo: Repository | None = None
+        self._tasks = BackgroundTasks()
+        self._generation = 0
+
+    def get(self, uuid: str) -> bytes | None:
+        """
+        Тело ответа с жанром.
+        :param uuid: id жанра
+        :return: JSON объекта модели DetailGenre или None, если жанра нет в снимке
+        """
+        return self.genres.get(uuid)
+
+    async def build(self):
+        """Построение снимка. Снимок не заменяется, если во время построения пришла инвалидация жанров."""
+        generation = self._generation
+        genres = GenreService.parse_multi(await self._repo.get_multi('genres', GenreService.multi_search()))
+        if generation != self._generation:
+            logger.debug('Genre catalogue build is outdated by invalidation')
+            return
+        if not genres:
+            # Пустой снимок не отличить от ещё не загруженного индекса: запросы идут в Elasticsearch
+            self.genres, self.body = MappingProxyType({}), None
+            logger.warning('Genre catalogue is not built: index genres is empty')
+            return
+        self.genres = MappingProxyType({genre['uuid']: orjson.dumps(genre) for genre in genres})
+        self.body = orjson.dumps(genres)
+        logger.info('Genre catalogue is built: %s genres', len(genres))
+
+    def start(self, repo: Repository):
+        self._repo = repo
+        self._tasks.start(self._rebuild, self.refresh_interval)
+
+    async def stop(self):
+        await self._tasks.stop()
+
+    def on_invalidation(self, message: dict):
+        """
+        Обработчик сообщений InvalidationListener. Инвалидированные жанры сразу удаляются из снимка, а список
+        жанров до перестроения отдаётся из Elasticsearch: среди id может быть жанр, которого ещё нет в снимке.
+        """
+        tags = message.get('tags', [])
+        ids = {tag.removeprefix(ID_TAG_PREFIX) for tag in tags if tag.startswith(ID_TAG_PREFIX)}
+        if message.get('action') == 'flush' or index_tag('genres') in tags:
+            self._discard(set(self.genres))
+        elif ids:
+            self._discard(ids)
+
+    def request_rebuild(self):
+        """Перестроение снимка, если он построен и жанр нашёлся в Elasticsearch, но отсутствует в снимке."""
+        if self._repo is not None and self.body is not None and not self._tasks.pending:
+            self._tasks.schedule(self._rebuild())
+
+    def _discard(self, genre_ids: set[str]):
+        self._generation += 1
+        self.genres = MappingProxyType({uuid: data for uuid, data in self.genres.items() if uuid not in genre_ids})
+        self.body = None
+        self._tasks.schedule(self._rebuild())
+
+    async def _rebuild(self):
+        try:
+            await self.build()
+        except ElasticsearchException:
+            logger.exception('Failed to build genre catalogue')
+
+
+genre_catalogue: GenreCatalogue = GenreCatalogue(refresh_interval=settings.genre_catalogue.REFRESH_INTERVAL_IN_SECONDS)
+
+
+async def get_genre_catalogue() -> GenreCatalogue:
+    return genre_catalogue
+
 
 @lru_cache()
 def get_genre_service(
     repo: Repository = Depends(get_repository),
+    doc_cache: DocumentCache = Depends(get_document_cache),
+    catalogue: GenreCatalogue = Depends(get_genre_catalogue),
 ) -> GenreService:
     """
     Провайдер для GenreService.
     :param repo: класс реализующий интерфейс Repository
+    :param doc_cache: кеш отдельных документов
+    :param catalogue: снимок всех жанров в памяти процесса
     :return: Объект класса GenreService для API
     """
-    return GenreService(repo)
+    return GenreService(repo, doc_cache, catalogue)
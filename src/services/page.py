@@ -0,0 +1,96 @@
+from functools import lru_cache
+
+import orjson
+from elasticsearch_dsl import Search
+from fastapi import Depends
+
+from core.logger import logger as _logger
+from db import passthrough
+from db.repository import Repository, get_repository
+from models.page import PageQuery, PageQueryType
+from services.film import FilmService, get_film_service
+from services.genre import GenreService, get_genre_service
+
+logger = _logger(__name__)
+
+
+class PageService:
+    def __init__(self, repo: Repository, film_service: FilmService, genre_service: GenreService):
+        """
+        :param repo: класс реализующий интерфейс Repository
+        :param film_service: сервис фильмов, строящий запросы списков фильмов
+        :param genre_service: сервис жанров, строящий запрос всех жанров
+        """
+        self.repo = repo
+        self.film_service = film_service
+        self.genre_service = genre_service
+
+    async def get(self, queries: list[PageQuery], **kwargs) -> bytes:
+        """
+        Выполнение запросов составной страницы. Все жанры берутся из GenreCatalogue, первые страницы списков
+        фильмов из FilmPages, остальные запросы выполняются одним _msearch.
+        :param queries: именованные запросы
+        :param kwargs: Параметры запроса, общие для всех запросов, например permissions
+        :return: JSON результатов запросов по их именам, пустой список для запросов без результатов
+        """
+        data: dict[str, bytes | list[dict]] = {query.name: [] for query in queries}
+        misses = []
+        for query in queries:
+            if not await self.film_service.is_known_genre(query.genre):
+                continue
+            if (cached := await self._get_cached(query, **kwargs)) is not None:
+                data[query.name] = cached
+            else:
+                misses.append(query)
+        responses = await self.repo.msearch([self._search(query, **kwargs) for query in misses])
+        for query, docs in zip(misses, responses):
+            if query.query_type == PageQueryType.films:
+                data[query.name] = self.film_service.parse_page(docs, query.sort, query.size)[0] or []
+            else:
+                data[query.name] = self.genre_service.parse_multi(docs)
+        logger.debug('[+] Return page of %s queries, %s from elastic.', len(queries), len(misses))
+        return passthrough.json_object(
+            {name: value if isinstance(value, bytes) else orjson.dumps(value) for name, value in data.items()},
+        )
+
+    async def _get_cached(self, query: PageQuery, **kwargs) -> bytes | None:
+        if query.query_type == PageQueryType.genres:
+            return self.genre_service.catalogue.body
+        if self.film_service.pages is None:
+            return None
+        page = await self.film_service.pages.get(
+            sort=query.sort.value,
+            page_num=1,
+            page_size=query.size,
+            _filter=query.genre,
+            permissions=kwargs.get('permissions'),
+        )
+        return page[0] if page is not None else None
+
+    def _search(self, query: PageQuery, **kwargs) -> tuple[str, Search]:
+        if query.query_type == PageQueryType.films:
+            search = self.film_service.page_search(
+                sort=query.sort,
+                page_num=1,
+                page_size=query.size,
+                _filter=query.genre,
+                permissions=kwargs.get('permissions'),
+            )
+            return 'movies', search
+        return 'genres', self.genre_service.multi_search()
+
+
+@lru_cache()
+def get_page_service(
+    repo: Repository = Depends(get_repository),
+    film_service: FilmService = Depends(get_film_service),
+    genre_service: GenreService = Depends(get_genre_service),
+) -> PageService:
+    """
+    Провайдер для PageService.
+    :param repo: класс реализующий интерфейс Repository
+    :param film_service: сервис фильмов
+    :param genre_service: сервис жанров
+    :return: Объект класса PageService
+    """
+    return PageService(repo, film_service, genre_service)
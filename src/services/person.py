@@ -1,22 +1,27 @@
 from functools import lru_cache
+from typing import AsyncIterator
 
 from elasticsearch_dsl import Q, Search
 from fastapi import Depends
 
 from core.logger import logger as _logger
+from db.cache import DocumentCache, get_document_cache
 from db.repository import Repository, get_repository
-from models.film import ESFilm
+from models.film import ESFilmShort
 from models.person import ESPerson
+from models.utils import source_fields
 
 logger = _logger(__name__)
 
 
 class PersonService:
-    def __init__(self, repo: Repository):
+    def __init__(self, repo: Repository, doc_cache: DocumentCache):
         """
         :param repo: класс реализующий интерфейс Repository
+        :param doc_cache: кеш отдельных документов
         """
         self.repo = repo
+        self.doc_cache = doc_cache
 
     async def get_by_id(self, person_id: str) -> dict | None:
         """
@@ -31,6 +36,20 @@ class PersonService:
         logger.debug('[+] Return person from elastic. id: %s', person_id)
         return data
 
+    async def get_by_ids(self, person_ids: list[str]) -> list[dict]:
+        """
+        Получение информации о нескольких персонах через кеш отдельных документов.
+        :param person_ids: id в БД
+        :return: Список объектов модели DetailPerson в порядке person_ids
+        """
+        data = await self.doc_cache.get_many('persons', person_ids, self._fetch_by_ids)
+        logger.debug('[+] Return %s persons by ids.', len(data))
+        return data
+
+    async def _fetch_by_ids(self, person_ids: list[str]) -> dict[str, dict]:
+        docs = await self.repo.mget('persons', person_ids, source=source_fields(ESPerson))
+        return {doc['_id']: ESPerson(**doc['_source']).dict() for doc in docs}
+
     async def get_person_by_search(self, **kwargs) -> list[dict] | None:
         """
         Получение и запись списка данных о фильмах.
@@ -39,7 +58,11 @@ class PersonService:
         """
         start = (kwargs['page_num'] - 1) * kwargs['page_size']
         stop = kwargs['page_size'] * kwargs['page_num']
-        search = Search(index='persons').query('multi_match', query=kwargs['query'], fuzziness='auto')[start:stop]
+        search = (
+            Search(index='persons')
+            .query('multi_match', query=kwargs['query'], fuzziness='auto')
+            .source(source_fields(ESPerson))[start:stop]
+        )
         docs = await self.repo.search('persons', search)
         if docs is None:
             return
@@ -47,39 +70,99 @@ class PersonService:
         logger.debug('[+] Return persons from elastic.')
         return data
 
-    async def get_film_person_by_search(self, **kwargs) -> list[dict] | None:
+    async def get_film_person_page(self, **kwargs) -> tuple[list[dict] | None, list | None]:
         """
-        Получение и запись списка данных о фильмах.
-        :param kwargs: Параметры запроса
-        :return: Список объектов модели FilmResponse
+        Получение страницы фильмов персоны по номеру страницы или после search_after.
+        Фильмы берутся через mget по film_ids из документа персоны, без поиска по всему индексу фильмов.
+        Если документа персоны или film_ids в нём нет, фильмы ищутся по вложенным полям фильмов.
+        :param kwargs: Параметры запроса; search_after уже проверен decode_cursor: [рейтинг, id]
+        :return: Список объектов модели FilmResponse и значения сортировки для следующей страницы
         """
-        search = (
+        doc = await self.repo.get('persons', kwargs['_person'], source=['film_ids'])
+        film_ids = doc['_source'].get('film_ids') if doc is not None else None
+        if film_ids is None:
+            return await self._get_film_person_page_by_search(**kwargs)
+        rows = await self.repo.mget('movies', film_ids, source=source_fields(ESFilmShort))
+        films = sorted(
+            (ESFilmShort(**row['_source']).dict() for row in rows),
+            key=lambda film: (-film['imdb_rating'], film['uuid']),
+        )
+        if search_after := kwargs.get('search_after'):
+            rating, _id = search_after
+            after = (-rating, _id)
+            films = [film for film in films if (-film['imdb_rating'], film['uuid']) > after][: kwargs['page_size']]
+        else:
+            start = (kwargs['page_num'] - 1) * kwargs['page_size']
+            stop = kwargs['page_size'] * kwargs['page_num']
+            films = films[start:stop]
+        next_page = [films[-1]['imdb_rating'], films[-1]['uuid']] if len(films) == kwargs['page_size'] else None
+        logger.debug('[+] Return person films from elastic by film_ids.')
+        return films, next_page
+
+    async def _get_film_person_page_by_search(self, **kwargs) -> tuple[list[dict] | None, list | None]:
+        search = self._film_person_search(kwargs['_person'])
+        if search_after := kwargs.get('search_after'):
+            search = search.extra(search_after=search_after, size=kwargs['page_size'])
+        else:
+            start = (kwargs['page_num'] - 1) * kwargs['page_size']
+            stop = kwargs['page_size'] * kwargs['page_num']
+            search = search[start:stop]
+        docs = await self.repo.search('movies', search)
+        if docs is None:
+            return None, None
+        hits = docs['hits']['hits']
+        data = [ESFilmShort(**row['_source']).dict() for row in hits]
+        next_page = hits[-1]['sort'] if len(hits) == kwargs['page_size'] else None
+        logger.debug('[+] Return person films from elastic.')
+        return data, next_page
+
+    async def iter_film_person(self, _person: str, batch_size: int) -> AsyncIterator[list[dict]]:
+        """
+        Последовательное получение всех фильмов персоны пачками через search_after.
+        :param _person: id персоны
+        :param batch_size: размер пачки
+        :return: асинхронный итератор списков объектов модели FilmResponse
+        """
+        search_after = None
+        while True:
+            search = self._film_person_search(_person).extra(size=batch_size)
+            if search_after:
+                search = search.extra(search_after=search_after)
+            docs = await self.repo.search('movies', search)
+            if docs is None or not (hits := docs['hits']['hits']):
+                return
+            yield [ESFilmShort(**row['_source']).dict() for row in hits]
+            if len(hits) < batch_size:
+                return
+            search_after = hits[-1]['sort']
+
+    @staticmethod
+    def _film_person_search(_person: str) -> Search:
+        return (
             Search(index='movies')
-            .sort('-imdb_rating')
-            .query(
+            .source(source_fields(ESFilmShort))
+            .sort('-imdb_rating', 'id')
+            .extra(track_total_hits=False)
+            .filter(
                 'bool',
                 should=[
-                    Q('nested', path='actors', query=Q('match', actors__id=kwargs['_person'])),
-                    Q('nested', path='writers', query=Q('match', writers__id=kwargs['_person'])),
-                    Q('nested', path='director', query=Q('match', director__id=kwargs['_person'])),
+                    Q('nested', path='actors', query=Q('match', actors__id=_person)),
+                    Q('nested', path='writers', query=Q('match', writers__id=_person)),
+                    Q('nested', path='director', query=Q('match', director__id=_person)),
                 ],
-            )[0:10_000]
+            )
         )
-        docs = await self.repo.search('movies', search)
-        if docs is None:
-            return
-        data = [ESFilm(**row['_source']).dict() for row in docs['hits']['hits']]
-        logger.debug('[+] Return person films from elastic.')
-        return data
 
 
 @lru_cache()
 def get_person_service(
     repo: Repository = Depends(get_repository),
+    doc_cache: DocumentCache = Depends(get_document_cache),
 ) -> PersonService:
     """
     Провайдер для PersonService.
     :param repo: класс реализующий интерфейс Repository
+    :param doc_cache: кеш отдельных документов
     :return: Объект класса PersonService
     """
-    return PersonService(repo)
+    return PersonService(repo, doc_cache)
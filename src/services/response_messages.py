@@ -11,3 +11,8 @@ class PersonMessages(str, Enum):
 
 class FilmMessages(str, Enum):
     not_found = 'Film not found'
+    too_deep_page = 'Page is too deep, use page[cursor]'
+
+
+class CacheMessages(str, Enum):
+    warming_in_progress = 'Cache warming is already in progress'
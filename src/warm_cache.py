@@ -0,0 +1,26 @@
+"""
+Прогрев кеша самыми частыми запросами из отдельного процесса, например после деплоя или очистки кеша.
+Запросы выполняются через приложение в этом процессе, ответы записываются в общий Redis.
+
+Запуск: cd src && python warm_cache.py
+"""
+import asyncio
+import sys
+
+import main
+from db import cache
+
+
+async def warm_cache() -> int | None:
+    try:
+        return await cache.cache_warmer.warm_once(main.app)
+    finally:
+        await main.shutdown()
+
+
+if __name__ == '__main__':
+    warmed = asyncio.run(warm_cache())
+    if warmed is None:
+        sys.stdout.write('Cache warming is already in progress\n')
+        sys.exit(1)
+    sys.stdout.write(f'Warmed {warmed} requests\n')
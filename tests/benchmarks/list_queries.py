@@ -0,0 +1,105 @@
+"""
+Сравнение прежней и текущей формы запроса списка фильмов на сгенерированном индексе из 1 млн документов:
+жанр в скоринговом bool/should и подсчёт total hits против bool.filter и track_total_hits=false.
+Нужен локальный Elasticsearch, например из tests/functional/docker-compose.yml.
+
+Запуск: ELASTIC_HOST=http://127.0.0.1:9200 python tests/benchmarks/list_queries.py
+"""
+import asyncio
+import copy
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Iterator
+
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_bulk
+from elasticsearch_dsl import Q, Search
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'functional'))
+
+from testdata.es_mapping import movies as movies_index  # noqa: E402
+
+INDEX = 'bench_movies'
+DOCS_COUNT = 1_000_000
+GENRES = [str(uuid.uuid5(uuid.NAMESPACE_OID, f'genre-{i}')) for i in range(20)]
+PAGE_SIZE = 50
+REPEATS = 50
+WARMUP = 5
+
+
+def generate_movies(count: int) -> Iterator[dict]:
+    for _ in range(count):
+        _id = str(uuid.uuid4())
+        yield {
+            '_index': INDEX,
+            '_id': _id,
+            'id': _id,
+            'title': f'Film {_id[:8]}',
+            'imdb_rating': round(random.uniform(1, 10), 1),  # noqa: DUO102
+            'only_sub': random.random() < 0.2,  # noqa: DUO102
+            'genre': [{'id': genre, 'name': 'Genre'} for genre in random.sample(GENRES, k=2)],  # noqa: DUO102
+        }
+
+
+async def create_index(client: AsyncElasticsearch):
+    if await client.indices.exists(index=INDEX):
+        if (await client.count(index=INDEX))['count'] == DOCS_COUNT:
+            return
+        await client.indices.delete(index=INDEX)
+    body = copy.deepcopy(movies_index)
+    body['mappings']['properties']['only_sub'] = {'type': 'boolean'}
+    body['settings']['refresh_interval'] = '-1'
+    await client.indices.create(index=INDEX, body=body)
+    await async_bulk(client, generate_movies(DOCS_COUNT), chunk_size=5000)
+    await client.indices.put_settings(index=INDEX, body={'refresh_interval': '1s'})
+    await client.indices.refresh(index=INDEX)
+    await client.indices.forcemerge(index=INDEX, max_num_segments=1)
+
+
+def old_query(genre: str) -> dict:
+    search = Search().query('match_all').source(['id', 'title', 'imdb_rating'])[0:PAGE_SIZE]
+    search = search.sort('-imdb_rating', 'id')
+    search = search.query('bool', should=[Q('nested', path='genre', query=Q('match', genre__id=genre))])
+    return search.to_dict()
+
+
+def new_query(genre: str) -> dict:
+    search = Search().source(['id', 'title', 'imdb_rating']).extra(track_total_hits=False)[0:PAGE_SIZE]
+    search = search.sort('-imdb_rating', 'id').exclude('term', only_sub=True)
+    search = search.filter('nested', path='genre', query=Q('term', genre__id=genre))
+    return search.to_dict()
+
+
+async def measure(client: AsyncElasticsearch, name: str, build_query):
+    for _ in range(WARMUP):
+        await client.search(index=INDEX, body=build_query(GENRES[0]), request_cache=False)
+    took, elapsed = [], []
+    for _ in range(REPEATS):
+        body = build_query(random.choice(GENRES))  # noqa: DUO102
+        start = time.perf_counter()
+        response = await client.search(index=INDEX, body=body, request_cache=False)
+        elapsed.append((time.perf_counter() - start) * 1000)
+        took.append(response['took'])
+    sys.stdout.write(
+        f'{name:<6} took median {statistics.median(took):7.1f} ms, p95 {sorted(took)[int(REPEATS * 0.95)]:7.1f} ms; '
+        f'round trip median {statistics.median(elapsed):7.1f} ms\n',
+    )
+
+
+async def main():
+    client = AsyncElasticsearch(hosts=os.environ.get('ELASTIC_HOST', 'http://127.0.0.1:9200'), timeout=600)
+    try:
+        await create_index(client)
+        for name, build_query in (('old', old_query), ('new', new_query)):
+            await measure(client, name, build_query)
+    finally:
+        await client.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""
+Сравнение сериализации страницы из 50 фильмов: повторная валидация через response_model
+и отдача уже подготовленных словарей через ORJSONResponse.
+
+Запуск: python tests/benchmarks/serialization.py
+"""
+import asyncio
+import sys
+import timeit
+import uuid
+from pathlib import Path
+
+import orjson
+
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'src'))
+
+from fastapi.responses import ORJSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from models.film import DetailFilmResponse, ESFilm, ESFilmShort, FilmResponse  # noqa: E402
+from services.film import DETAIL_FIELDS  # noqa: E402
+
+PAGE_SIZE = 50
+NUMBER = 200
+
+loop = asyncio.new_event_loop()
+
+
+def make_person() -> dict:
+    return {'id': str(uuid.uuid4()), 'name': 'Person Name'}
+
+
+def make_film() -> dict:
+    return {
+        'id': str(uuid.uuid4()),
+        'title': 'Film Title',
+        'description': 'Film description ' * 10,
+        'imdb_rating': 7.5,
+        'director': [make_person()],
+        'actors_names': ['Person Name'] * 5,
+        'writers_names': ['Person Name'] * 2,
+        'actors': [make_person() for _ in range(5)],
+        'writers': [make_person() for _ in range(2)],
+        'genre': [{'id': str(uuid.uuid4()), 'name': 'Genre'} for _ in range(2)],
+        'only_sub': False,
+    }
+
+
+def validated(rows: list[dict], model: type, response_model, include: set | None = None) -> bytes:
+    field = create_response_field(name='response', type_=response_model)
+    content = [model(**row).dict(include=include) for row in rows]
+    content = loop.run_until_complete(serialize_response(field=field, response_content=content))
+    return ORJSONResponse(content).body
+
+
+def prepared(rows: list[dict], model: type, include: set | None = None) -> bytes:
+    return ORJSONResponse([model(**row).dict(include=include) for row in rows]).body
+
+
+def report(name: str, statement) -> None:
+    seconds = timeit.timeit(statement, number=NUMBER) / NUMBER
+    sys.stdout.write(f'{name:<40} {seconds * 1000:8.3f} ms\n')
+
+
+def main():
+    rows = [make_film() for _ in range(PAGE_SIZE)]
+    assert orjson.loads(validated(rows, ESFilmShort, list[FilmResponse])) == orjson.loads(prepared(rows, ESFilmShort))
+    assert orjson.loads(validated(rows, ESFilm, list[DetailFilmResponse], DETAIL_FIELDS)) == orjson.loads(
+        prepared(rows, ESFilm, DETAIL_FIELDS),
+    )
+    report('list: response_model', lambda: validated(rows, ESFilmShort, list[FilmResponse]))
+    report('list: ORJSONResponse', lambda: prepared(rows, ESFilmShort))
+    report('detail x50: response_model', lambda: validated(rows, ESFilm, list[DetailFilmResponse], DETAIL_FIELDS))
+    report('detail x50: ORJSONResponse', lambda: prepared(rows, ESFilm, DETAIL_FIELDS))
+
+
+if __name__ == '__main__':
+    main()
@@ -97,15 +97,8 @@ def make_get_request(aiohttp_client: aiohttp.ClientSession):
     ):
         url = ''.join([test_settings.service_url, handler_url])
 
-        if query_data:
-            async with aiohttp_client.get(url, params=query_data) as response:
-                yield response
-        elif headers:
-            async with aiohttp_client.get(url, headers=headers) as response:
-                yield response
-        else:
-            async with aiohttp_client.get(url) as response:
-                yield response
+        async with aiohttp_client.get(url, params=query_data, headers=headers) as response:
+            yield response
 
     return inner
 
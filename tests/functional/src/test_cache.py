@@ -1,6 +1,9 @@
+import datetime
 import http
 
+import jwt
 import pytest
+from settings import test_settings
 from testdata import index_fillings as es_test_data
 
 
@@ -37,6 +40,20 @@ def person_cache_exepted():
     ][0:20]
 
 
+@pytest.fixture
+def subscriber_headers():
+    token = jwt.encode(
+        {
+            'exp': datetime.datetime.utcnow() + datetime.timedelta(seconds=60),
+            'iat': datetime.datetime.utcnow(),
+            'permissions': ['Subscriber'],
+        },
+        test_settings.SECRET,
+        algorithm='HS256',
+    )
+    return {'Authorization': f'Bearer {token}'}
+
+
 @pytest.mark.asyncio
 async def test_cache(
     make_get_request,
@@ -138,3 +155,93 @@ async def test_cache(
         body = await response.json()
         assert len(body) == len(person_cache_exepted), 'Проверка количества полей.'
         assert body == person_cache_exepted, 'Проверка соответствия данных.'
+
+
+@pytest.mark.asyncio
+async def test_etag(make_get_request, es_write_data):
+    """Условный запрос к закешированному ответу."""
+
+    await es_write_data(
+        index='genres',
+        data=es_test_data.genres,
+    )
+    genre_id = es_test_data.genres[0].get('id')
+    async with make_get_request(
+        handler_url=f'/api/v1/genres/{genre_id}',
+    ) as response:
+        assert response.status == http.HTTPStatus.OK
+        etag = response.headers.get('ETag')
+        assert etag, 'Проверка наличия ETag.'
+
+    async with make_get_request(
+        handler_url=f'/api/v1/genres/{genre_id}',
+        headers={'If-None-Match': etag},
+    ) as response:
+        assert response.status == http.HTTPStatus.NOT_MODIFIED
+        assert response.headers.get('ETag') == etag, 'Проверка ETag в ответе 304.'
+        assert await response.read() == b'', 'Проверка отсутствия тела.'
+
+    async with make_get_request(
+        handler_url=f'/api/v1/genres/{genre_id}',
+        headers={'If-None-Match': '"outdated"'},
+    ) as response:
+        assert response.status == http.HTTPStatus.OK
+        assert response.headers.get('ETag') == etag, 'Проверка ETag в ответе из кеша.'
+
+
+@pytest.mark.asyncio
+async def test_subscriber_film_cache(make_get_request, es_write_data, subscriber_headers):
+    """Фильм только для подписчиков: ответ анонимному пользователю не отдаётся подписчику из кеша."""
+
+    await es_write_data(
+        index='movies',
+        data=es_test_data.subscriber_movies,
+    )
+    film_id = next(film['id'] for film in es_test_data.subscriber_movies if film['only_sub'])
+    for _ in range(2):
+        async with make_get_request(
+            handler_url=f'/api/v1/films/{film_id}',
+        ) as response:
+            assert response.status == http.HTTPStatus.NOT_FOUND, 'Проверка недоступности фильма без подписки.'
+
+    async with make_get_request(
+        handler_url=f'/api/v1/films/{film_id}',
+        headers=subscriber_headers,
+    ) as response:
+        assert response.status == http.HTTPStatus.OK, 'Проверка доступности фильма подписчику.'
+        body = await response.json()
+        assert body['uuid'] == film_id, 'Проверка соответствия данных.'
+
+
+@pytest.mark.asyncio
+async def test_subscriber_films_list(make_get_request, es_write_data, subscriber_headers):
+    """Фильмы только для подписчиков исключаются из списка для анонимного пользователя, но не для подписчика."""
+
+    await es_write_data(
+        index='genres',
+        data=es_test_data.subscriber_genres,
+    )
+    await es_write_data(
+        index='movies',
+        data=es_test_data.subscriber_movies,
+    )
+    query_data = {'sort': '-imdb_rating', 'filter[genre]': es_test_data.subscriber_genre_id}
+    public_ids = [film['id'] for film in es_test_data.subscriber_movies if not film['only_sub']]
+    for _ in range(2):
+        async with make_get_request(
+            handler_url='/api/v1/films/',
+            query_data=query_data,
+        ) as response:
+            assert response.status == http.HTTPStatus.OK
+            body = await response.json()
+            assert [film['uuid'] for film in body] == public_ids, 'Проверка отсутствия фильмов для подписчиков.'
+
+    async with make_get_request(
+        handler_url='/api/v1/films/',
+        query_data=query_data,
+        headers=subscriber_headers,
+    ) as response:
+        assert response.status == http.HTTPStatus.OK
+        body = await response.json()
+        expected = sorted(es_test_data.subscriber_movies, key=lambda film: -film['imdb_rating'])
+        assert [film['uuid'] for film in body] == [film['id'] for film in expected], 'Проверка наличия всех фильмов.'
@@ -1,5 +1,7 @@
+import base64
 import http
 
+import orjson
 import pytest
 from testdata import index_fillings as es_test_data
 
@@ -230,3 +232,73 @@ async def test_search_films(make_get_request, es_write_data):
         assert response.status == http.HTTPStatus.OK
         body = await response.json()
         assert len(body) == 30, 'Проверка наличия всех фильмов.'
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination_films(make_get_request, es_write_data):
+    """Постраничный обход фильмов по курсору."""
+
+    await es_write_data(
+        index='movies',
+        data=es_test_data.movies,
+    )
+    page_size = 10
+    async with make_get_request(
+        handler_url='/api/v1/films/',
+        query_data={'sort': '-imdb_rating', 'page[size]': page_size},
+    ) as response:
+        assert response.status == http.HTTPStatus.OK
+        cursor = response.headers.get('X-Next-Cursor')
+        assert cursor, 'Проверка наличия курсора следующей страницы.'
+
+    async with make_get_request(
+        handler_url='/api/v1/films/',
+        query_data={'sort': '-imdb_rating', 'page[size]': page_size, 'page[number]': 2},
+    ) as response:
+        page_by_number = await response.json()
+
+    async with make_get_request(
+        handler_url='/api/v1/films/',
+        query_data={'sort': '-imdb_rating', 'page[size]': page_size, 'page[cursor]': cursor},
+    ) as response:
+        assert response.status == http.HTTPStatus.OK
+        body = await response.json()
+        assert body == page_by_number, 'Проверка соответствия страницы по курсору и по номеру.'
+
+    async with make_get_request(
+        handler_url='/api/v1/films/',
+        query_data={'sort': '-imdb_rating', 'page[size]': 50, 'page[number]': 201},
+    ) as response:
+        assert response.status == http.HTTPStatus.BAD_REQUEST, 'Проверка глубокой страницы без курсора.'
+
+    async with make_get_request(
+        handler_url='/api/v1/films/',
+        query_data={'sort': '-imdb_rating', 'page[cursor]': 'wrong'},
+    ) as response:
+        assert response.status == http.HTTPStatus.UNPROCESSABLE_ENTITY, 'Проверка невалидного курсора.'
+
+    for wrong_cursor in ([1], [{}], [], ['a', 'b']):
+        async with make_get_request(
+            handler_url='/api/v1/films/',
+            query_data={
+                'sort': '-imdb_rating',
+                'page[cursor]': base64.urlsafe_b64encode(orjson.dumps(wrong_cursor)).decode(),
+            },
+        ) as response:
+            assert response.status == http.HTTPStatus.UNPROCESSABLE_ENTITY, 'Проверка курсора неверной формы.'
+
+
+@pytest.mark.asyncio
+async def test_film_by_id_without_index(make_get_request, es_write_data, es_drop_data):
+    """Поиск по id при отсутствующем индексе."""
+
+    await es_write_data(
+        index='movies',
+        data=es_test_data.movies,
+    )
+    await es_drop_data(index='movies')
+    film_id = es_test_data.movies[-1].get('id')
+    async with make_get_request(
+        handler_url=f'/api/v1/films/{film_id}',
+    ) as response:
+        assert response.status == http.HTTPStatus.NOT_FOUND, 'Проверка поиска по id в удалённом индексе.'
@@ -1,6 +1,7 @@
 import http
 
 import pytest
+from settings import test_settings
 from testdata import index_fillings as es_test_data
 
 
@@ -68,3 +69,44 @@ async def test_full_films(make_get_request, es_write_data, genre_full_exepted):
         assert len(body) == len(genre_full_exepted), 'Проверка наличия всех фильмов.'
 
         assert body == genre_full_exepted, 'Проверка соответствия данных.'
+
+
+@pytest.mark.asyncio
+async def test_genres_batch(aiohttp_client, es_write_data, genre_full_exepted):
+    """Поиск жанров по списку id."""
+
+    await es_write_data(
+        index='genres',
+        data=es_test_data.genres,
+    )
+    url = ''.join([test_settings.service_url, '/api/v1/genres/batch'])
+    ids = [genre['uuid'] for genre in reversed(genre_full_exepted)]
+    async with aiohttp_client.post(url, json={'ids': [ids[0], 'g000-000-000-000-000', *ids[1:]]}) as response:
+        assert response.status == http.HTTPStatus.OK
+        body = await response.json()
+        assert body == genre_full_exepted[::-1], 'Проверка найденных жанров и их порядка.'
+
+    async with aiohttp_client.post(url, json={'ids': ids[:1]}) as response:
+        assert response.status == http.HTTPStatus.OK
+        body = await response.json()
+        assert body == genre_full_exepted[-1:], 'Проверка жанра из кеша документов.'
+
+    async with aiohttp_client.post(url, json={'ids': []}) as response:
+        assert response.status == http.HTTPStatus.UNPROCESSABLE_ENTITY, 'Проверка пустого списка id.'
+
+
+@pytest.mark.asyncio
+async def test_genre_without_description(make_get_request, es_write_data):
+    """Жанр без описания отдаётся со всеми полями модели, как из снимка жанров."""
+
+    genre = {'id': '3d8d9bf5-0d90-4353-88ba-4ccc5d2c07ff', 'name': 'Western'}
+    await es_write_data(
+        index='genres',
+        data=[genre],
+    )
+    async with make_get_request(
+        handler_url=f'/api/v1/genres/{genre["id"]}',
+    ) as response:
+        assert response.status == http.HTTPStatus.OK
+        body = await response.json()
+        assert body == {'uuid': genre['id'], 'name': genre['name'], 'description': None}, 'Проверка полей жанра.'
@@ -0,0 +1,33 @@
+import http
+
+import pytest
+from settings import test_settings
+from testdata import index_fillings as es_test_data
+
+
+@pytest.mark.asyncio
+async def test_home_page(aiohttp_client, es_write_data):
+    """Составная страница из нескольких именованных запросов."""
+
+    await es_write_data(
+        index='movies',
+        data=es_test_data.movies,
+    )
+    await es_write_data(
+        index='genres',
+        data=es_test_data.genres,
+    )
+    url = ''.join([test_settings.service_url, '/api/v1/pages/home'])
+    queries = [
+        {'name': 'genres', 'type': 'genres'},
+        {'name': 'top', 'type': 'films', 'sort': '-imdb_rating', 'size': 10},
+    ]
+    async with aiohttp_client.post(url, json={'queries': queries}) as response:
+        assert response.status == http.HTTPStatus.OK
+        body = await response.json()
+        assert set(body) == {'genres', 'top'}, 'Проверка имён результатов.'
+        assert len(body['genres']) == len(es_test_data.genres), 'Проверка наличия всех жанров.'
+        assert len(body['top']) == 10, 'Проверка размера списка фильмов.'
+
+    async with aiohttp_client.post(url, json={'queries': queries + queries[:1]}) as response:
+        assert response.status == http.HTTPStatus.UNPROCESSABLE_ENTITY, 'Проверка повторяющихся имён запросов.'
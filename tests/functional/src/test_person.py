@@ -113,3 +113,93 @@ async def test_person_films_by_id(make_get_request, es_write_data, person_films_
     ) as response:
 
         assert response.status == http.HTTPStatus.NOT_FOUND, 'Проверка поиска по несуществующему id.'
+
+
+@pytest.mark.asyncio
+async def test_person_films_pagination(make_get_request, es_write_data):
+    """Постраничный обход фильмов персоны по номеру страницы и по курсору."""
+
+    await es_write_data(
+        index='movies',
+        data=es_test_data.movies,
+    )
+    await es_write_data(
+        index='persons',
+        data=es_test_data.persons,
+    )
+    person_id = '26e83050-29ef-4163-a99d-b546cac208f8'
+    page_size = 20
+    async with make_get_request(
+        handler_url=f'/api/v1/persons/{person_id}/film',
+        query_data={'page[size]': page_size},
+    ) as response:
+        assert response.status == http.HTTPStatus.OK
+        first_page = await response.json()
+        assert len(first_page) == page_size, 'Проверка размера страницы.'
+        cursor = response.headers.get('X-Next-Cursor')
+        assert cursor, 'Проверка наличия курсора следующей страницы.'
+
+    async with make_get_request(
+        handler_url=f'/api/v1/persons/{person_id}/film',
+        query_data={'page[size]': page_size, 'page[number]': 2},
+    ) as response:
+        assert response.status == http.HTTPStatus.OK
+        page_by_number = await response.json()
+
+    async with make_get_request(
+        handler_url=f'/api/v1/persons/{person_id}/film',
+        query_data={'page[size]': page_size, 'page[cursor]': cursor},
+    ) as response:
+        assert response.status == http.HTTPStatus.OK
+        body = await response.json()
+        assert body == page_by_number, 'Проверка соответствия страницы по курсору и по номеру.'
+        assert not {film['uuid'] for film in body} & {film['uuid'] for film in first_page}, 'Проверка без повторов.'
+        cursor = response.headers.get('X-Next-Cursor')
+
+    async with make_get_request(
+        handler_url=f'/api/v1/persons/{person_id}/film',
+        query_data={'page[size]': page_size, 'page[cursor]': cursor},
+    ) as response:
+        assert response.status == http.HTTPStatus.OK
+        body = await response.json()
+        assert len(body) == 10, 'Проверка последней страницы (Актер во всех 50 фильмах).'
+        assert 'X-Next-Cursor' not in response.headers, 'Проверка отсутствия курсора на последней странице.'
+
+    async with make_get_request(
+        handler_url=f'/api/v1/persons/{person_id}/film',
+        query_data={'page[cursor]': 'wrong'},
+    ) as response:
+        assert response.status == http.HTTPStatus.UNPROCESSABLE_ENTITY, 'Проверка невалидного курсора.'
+
+
+@pytest.mark.asyncio
+async def test_person_films_stream(make_get_request, es_write_data):
+    """Выдача всех фильмов персоны потоком."""
+
+    await es_write_data(
+        index='movies',
+        data=es_test_data.movies,
+    )
+    person_id = '26e83050-29ef-4163-a99d-b546cac208f8'
+    async with make_get_request(
+        handler_url=f'/api/v1/persons/{person_id}/film',
+        query_data={'page[size]': 50},
+    ) as response:
+        assert response.status == http.HTTPStatus.OK
+        page = await response.json()
+
+    async with make_get_request(
+        handler_url=f'/api/v1/persons/{person_id}/film',
+        query_data={'stream': 'true'},
+    ) as response:
+        assert response.status == http.HTTPStatus.OK
+        body = await response.json()
+        assert len(body) == 50, 'Проверка количества фильмов (Актер во всех фильмах).'
+        assert body == page, 'Проверка соответствия потока странице со всеми фильмами.'
+
+    wrong_person_id = 'p000-000-000-000-000'
+    async with make_get_request(
+        handler_url=f'/api/v1/persons/{wrong_person_id}/film',
+        query_data={'stream': 'true'},
+    ) as response:
+        assert response.status == http.HTTPStatus.NOT_FOUND, 'Проверка потока по несуществующему id.'
@@ -97,3 +97,83 @@ async def test_cache(
         query_data={'sort': '-imdb_rating'},
     ) as response:
         assert response.status == http.HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_invalidate(
+    make_get_request,
+    aiohttp_client,
+    es_write_data,
+    es_drop_data,
+):
+    """Инвалидация кеша по id документов и индексам."""
+
+    # Запись данных в Elasticsearch
+    await es_write_data(
+        index='movies',
+        data=es_test_data.movies,
+    )
+    await es_write_data(
+        index='genres',
+        data=es_test_data.genres,
+    )
+
+    # Запись данных в кеш
+    genre_id = es_test_data.genres[0].get('id')
+    async with make_get_request(
+        handler_url=f'/api/v1/genres/{genre_id}',
+    ) as response:
+        assert response.status == http.HTTPStatus.OK
+
+    async with make_get_request(
+        handler_url='/api/v1/films/',
+        query_data={'sort': '-imdb_rating'},
+    ) as response:
+        assert response.status == http.HTTPStatus.OK
+
+    # Удаление данных из Elasticsearch
+    await es_drop_data(index='movies')
+    await es_drop_data(index='genres')
+
+    token = jwt.encode(
+        {'exp': datetime.datetime.utcnow() + datetime.timedelta(seconds=10), 'iat': datetime.datetime.utcnow()},
+        test_settings.SECRET,
+        algorithm='HS256',
+    )
+    url = ''.join([test_settings.service_url, '/api/v1/services/invalidate'])
+
+    # Инвалидация по id жанра
+    async with aiohttp_client.post(
+        url,
+        json={'ids': [genre_id]},
+        headers={'Authorization': f'Bearer {token}'},
+    ) as response:
+        assert response.status == http.HTTPStatus.OK
+        body = await response.json()
+        assert body == {'invalidated': 1}, 'Проверка количества удалённых записей.'
+
+    async with make_get_request(
+        handler_url=f'/api/v1/genres/{genre_id}',
+    ) as response:
+        assert response.status == http.HTTPStatus.NOT_FOUND
+
+    # Запись фильмов осталась в кеше
+    async with make_get_request(
+        handler_url='/api/v1/films/',
+        query_data={'sort': '-imdb_rating'},
+    ) as response:
+        assert response.status == http.HTTPStatus.OK
+
+    # Инвалидация по индексу
+    async with aiohttp_client.post(
+        url,
+        json={'indices': ['movies']},
+        headers={'Authorization': f'Bearer {token}'},
+    ) as response:
+        assert response.status == http.HTTPStatus.OK
+
+    async with make_get_request(
+        handler_url='/api/v1/films/',
+        query_data={'sort': '-imdb_rating'},
+    ) as response:
+        assert response.status == http.HTTPStatus.NOT_FOUND
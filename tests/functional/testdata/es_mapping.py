@@ -29,6 +29,7 @@ movies = {
         'properties': {
             'id': {'type': 'keyword'},
             'imdb_rating': {'type': 'float'},
+            'only_sub': {'type': 'boolean'},
             'genre': {
                 'type': 'nested',
                 'dynamic': 'strict',
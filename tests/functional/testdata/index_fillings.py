@@ -80,3 +80,37 @@ persons = [
     {'id': 'efdd1787-8871-4aa9-b1d7-f68e55b913ed', 'full_name': 'Howard', 'role': ['director'], 'film_ids': film_ids_2},
     {'id': 'a5a8f573-3cee-4ccc-8a2b-91cb9f55250a', 'full_name': 'Boby', 'role': ['director'], 'film_ids': film_ids_1},
 ]
+
+subscriber_genre_id = 'c9e1b6a1-3b0c-4e7f-9a55-8d1f2a0b7e11'
+
+subscriber_genres = [
+    {'id': subscriber_genre_id, 'name': 'Noir', 'description': 'Description'},
+]
+
+subscriber_movies = [
+    {
+        'id': film_id,
+        'title': 'The Noir',
+        'imdb_rating': rating,
+        'description': 'Noir',
+        'only_sub': only_sub,
+        'genre': [
+            {'id': subscriber_genre_id, 'name': 'Noir'},
+        ],
+        'director': [
+            {'id': 'a5a8f573-3cee-4ccc-8a2b-91cb9f55250a', 'name': 'Stan'},
+        ],
+        'actors_names': ['Ann'],
+        'writers_names': ['Ben'],
+        'actors': [
+            {'id': '26e83050-29ef-4163-a99d-b546cac208f8', 'name': 'Ann'},
+        ],
+        'writers': [
+            {'id': 'e039eedf-4daf-452a-bf92-a0085c68e156', 'name': 'Ben'},
+        ],
+    }
+    for film_id, rating, only_sub in (
+        ('0b8a3f7e-5c2d-4b6a-9e1f-3d7c8a2b4e60', 7.1, False),
+        ('5e2f9c4d-8a1b-4d3e-b7f6-0c9a1e2d3f48', 9.3, True),
+    )
+]